@@ -1,14 +1,23 @@
 import os
 import json
+import threading
 try:
     from qgenie import ChatMessage, QGenieClient
     QGENIE_AVAILABLE = True
 except ImportError:
     QGENIE_AVAILABLE = False
 
+# One client per process: reuses its HTTP session instead of a new TLS handshake per call
+_client = None
+_client_lock = threading.Lock()
+
 def get_client():
+    global _client
     if not QGENIE_AVAILABLE: return None
-    return QGenieClient()
+    if _client is None:
+        with _client_lock:
+            if _client is None: _client = QGenieClient()
+    return _client
 
 def chat_with_history(history_file, system_context, user_question, file_data=None):
     history = []
@@ -1,22 +1,50 @@
 import os
+import re
 import subprocess
 import json
 import sys
 import threading
 import tempfile
-from flask import Blueprint, render_template_string, request, jsonify
+import pty
+import fcntl
+import termios
+import struct
+import codecs
+import collections
+import functools
+import gzip
+import hashlib
+import itertools
+import select
+import shlex
+import stat
+import mimetypes
+import signal
+import time
+import uuid
+import urllib.parse
+from flask import Blueprint, current_app, request, jsonify, send_file, abort
+from flask_socketio import Namespace
 
 # --- SAFE IMPORT HELPER ---
 # Prevents crashes if web_manager isn't ready when this module loads
+# get_config rescans the workspace, so found projects are reused for CONFIG_TTL seconds
+CONFIG_TTL = 5.0
+config_cache = {}  # { project_name: (fetched_at, (root, cfg)) }
+
 def get_config_safe(project_name):
     """Safely retrieves project configuration from web_manager."""
+    hit = config_cache.get(project_name)
+    if hit and time.monotonic() - hit[0] < CONFIG_TTL: return hit[1]
     try:
         import web_manager
-        return web_manager.get_config(project_name)
+        res = web_manager.get_config(project_name)
     except ImportError:
         return os.getcwd(), {}
     except AttributeError:
         return os.getcwd(), {}
+    if res[0]: config_cache[project_name] = (time.monotonic(), res)
+    return res
 
 # --- AI HELPER IMPORT ---
 try:
@@ -25,13 +53,131 @@ try:
 except ImportError:
     AI_AVAILABLE = False
 
+# --- FAST JSON ---
+# orjson (Rust, emits UTF-8 bytes directly) when installed; falls back to Flask's jsonify
+try:
+    import orjson
+    def ojson(obj, status=200):
+        return current_app.response_class(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), status=status, mimetype='application/json')
+    def json_body():
+        # Same content-type gate as request.json: cross-site text/plain posts stay rejected
+        if not request.is_json: abort(415)
+        return orjson.loads(request.get_data() or b'null')
+except ImportError:
+    def ojson(obj, status=200):
+        r = jsonify(obj); r.status_code = status
+        return r
+    def json_body():
+        return request.json
+
 editor_bp = Blueprint('editor_bp', __name__)
 
 # --- GLOBAL CHAT HISTORY ---
 # Stores conversation history in memory: { 'project_name': [messages...] }
 chat_histories = {}
 
+# --- CHAT CODE WINDOW ---
+# The chat prompt carries a token-bounded window around the cursor, not the whole buffer
+CHAT_CONTEXT_TOKENS = 1500
+try:
+    import tiktoken
+    _TOKENIZER = tiktoken.get_encoding('cl100k_base')
+    def count_tokens(text): return len(_TOKENIZER.encode(text, disallowed_special=()))
+except Exception:
+    def count_tokens(text): return len(text) // 4 + 1  # ~4 chars per token
+OUTLINE_RE = re.compile(r'^\s*(?:async\s+)?(?:def|class)\s+\w+')
+OUTLINE_MAX_LINES = 300  # cap on the client-built outline of the whole buffer
+
+def code_window(lines, cursor, budget=CHAT_CONTEXT_TOKENS):
+    """Returns the (first, last) line indexes of a window centred on cursor that fits budget."""
+    if not lines: return 0, -1
+    cursor = min(max(cursor, 0), len(lines) - 1)
+    lo = hi = cursor
+    used = count_tokens(lines[cursor])
+    while used < budget and (lo > 0 or hi < len(lines) - 1):
+        if hi < len(lines) - 1:
+            hi += 1; used += count_tokens(lines[hi])
+        if lo > 0 and used < budget:
+            lo -= 1; used += count_tokens(lines[lo])
+    return lo, hi
+
+def code_outline(lines, first=0):
+    """def/class lines with their line numbers, used when the client sent no whole-file outline."""
+    return "\n".join(f"{first+i+1}: {l.strip()}" for i, l in enumerate(lines) if OUTLINE_RE.match(l))
+
+# --- AI JOBS ---
+# { job_id: {'status': 'running'|'done'|'failed', 'chunks': [...], 'error': str, 'finished': monotonic|None} }
+# Model calls run on worker threads; clients read their output from /editor/api/ai_stream/<job_id>
+AI_JOBS = {}
+AI_STREAM_TICK = 0.05
+AI_JOB_TTL = 300  # seconds a finished job waits for its reader before it is dropped
+
+def _run_ai_job(job_id, produce):
+    job = AI_JOBS[job_id]
+    try:
+        produce(job['chunks'].append)
+        job['status'] = 'done'
+    except Exception as e:
+        job['error'] = str(e)
+        job['status'] = 'failed'
+    job['finished'] = time.monotonic()
+
+def start_ai_job(produce):
+    """Runs produce(emit) on a worker thread; emit(text) publishes output to the job's stream."""
+    # Jobs nobody streamed (closed tab, dropped EventSource) would otherwise keep their reply forever
+    cutoff = time.monotonic() - AI_JOB_TTL
+    for jid, job in list(AI_JOBS.items()):
+        if job['finished'] is not None and job['finished'] < cutoff: AI_JOBS.pop(jid, None)
+    job_id = uuid.uuid4().hex
+    AI_JOBS[job_id] = {'status': 'running', 'chunks': [], 'error': '', 'finished': None}
+    threading.Thread(target=_run_ai_job, args=(job_id, produce), daemon=True).start()
+    return job_id
+
+# --- FILE TREE CACHE ---
+# LRU of { abs_dir: (dir_mtime_ns, cached_at, listing) } - served while mtime matches and entry is fresh
+tree_cache = collections.OrderedDict()
+tree_lock = threading.Lock()
+TREE_CACHE_TTL = 5.0
+TREE_CACHE_SIZE = 512
+
+def invalidate_tree(abs_path):
+    """Drops the cached listing of the directory containing abs_path."""
+    with tree_lock: tree_cache.pop(os.path.dirname(os.path.normpath(abs_path)), None)
+
+def cached_listing(abs_dir, mtime):
+    """Returns the cached listing of abs_dir if it is still valid for mtime, else None."""
+    with tree_lock:
+        hit = tree_cache.get(abs_dir)
+        if not hit or hit[0] != mtime or time.monotonic() - hit[1] >= TREE_CACHE_TTL: return None
+        tree_cache.move_to_end(abs_dir)
+        return hit[2]
+
+def store_listing(abs_dir, mtime, listing):
+    with tree_lock:
+        tree_cache[abs_dir] = (mtime, time.monotonic(), listing)
+        tree_cache.move_to_end(abs_dir)
+        while len(tree_cache) > TREE_CACHE_SIZE: tree_cache.popitem(last=False)
+
+# --- PATH SANDBOX ---
+# realpath of each project root, resolved once
+real_root = functools.lru_cache(maxsize=64)(os.path.realpath)
+
+def safe_join(root, rel):
+    """Resolves rel under root; raises PermissionError if the result escapes root."""
+    base = real_root(root)
+    p = os.path.realpath(os.path.join(base, rel or ''))
+    if p != base and not p.startswith(base + os.sep):
+        raise PermissionError(f"Invalid path security: {rel}")
+    return p
+
 # --- GIT HELPER FUNCTIONS ---
+# LRU of { abs_dir: git_root } - only hits are cached, so a later `git init` in a dir that had no
+# repo above it is still picked up. Limitation: once a dir maps to an outer root, a `git init` in a
+# subdirectory between the two is not seen until that entry is evicted (or the outer .git goes away).
+git_root_cache = collections.OrderedDict()
+git_root_lock = threading.Lock()
+GIT_ROOT_CACHE_SIZE = 256
+
 def find_git_root(start_path):
     """
     Recursively searches upwards for a .git directory OR file.
@@ -40,13 +186,23 @@ def find_git_root(start_path):
     if not start_path or not os.path.exists(start_path):
         return None
     
-    path = os.path.abspath(start_path)
+    path = start = os.path.abspath(start_path)
+    
+    # Cached hit costs one stat to confirm the .git entry is still there
+    with git_root_lock:
+        cached = git_root_cache.get(start)
+        if cached: git_root_cache.move_to_end(start)
+    if cached and os.path.exists(os.path.join(cached, '.git')):
+        return cached
     
     # Safety check to prevent infinite loops (stop at root)
     while path != os.path.dirname(path): 
         git_check = os.path.join(path, '.git')
         # FIX: Check if it exists (file OR dir), not just isdir
         if os.path.exists(git_check): 
+            with git_root_lock:
+                git_root_cache[start] = path
+                if len(git_root_cache) > GIT_ROOT_CACHE_SIZE: git_root_cache.popitem(last=False)
             return path
         path = os.path.dirname(path)
     
@@ -63,7 +219,8 @@ def get_cwd_context(project, path_arg):
     # Determine start point for search (File location or Project Root)
     search_start = project_root
     if path_arg:
-        full_path = os.path.join(project_root, path_arg)
+        try: full_path = safe_join(project_root, path_arg)
+        except PermissionError: full_path = project_root
         if os.path.exists(full_path):
             search_start = os.path.dirname(full_path) if os.path.isfile(full_path) else full_path
 
@@ -78,6 +235,7 @@ def get_cwd_context(project, path_arg):
     return git_root if git_root else project_root
 
 # --- HTML TEMPLATE ---
+# Inline bootstrap only; CSS/JS live in IDE_CSS/IDE_JS and are served from /editor/assets
 IDE_HTML = """
 <!DOCTYPE html>
 <html>
@@ -86,149 +244,23 @@ IDE_HTML = """
     <title>Pro Editor AI - {{ project }}</title>
     
     <!-- CODE EDITOR LIB (Monaco) -->
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/monaco-editor/0.44.0/min/vs/loader.min.js"></script>
+    <script src="{{ assets.monaco }}/vs/loader.min.js"></script>
     
     <!-- TERMINAL LIB (XTerm) -->
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/xterm/3.14.5/xterm.min.css" rel="stylesheet"/>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/xterm/3.14.5/xterm.min.js"></script>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/xterm/3.14.5/addons/fit/fit.min.js"></script>
-    
+    <link href="{{ assets.xterm }}/css/xterm.css" rel="stylesheet"/>
+    <script src="{{ assets.xterm }}/lib/xterm.js"></script>
+    <script src="{{ assets.xterm_fit }}/lib/xterm-addon-fit.js"></script>
+    <script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.1/socket.io.js"></script>
+
     <!-- ICONS -->
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet"/>
+    <link href="{{ assets.fontawesome }}/css/all.min.css" rel="stylesheet"/>
     
     <!-- MARKDOWN LIB (Optional - with fallback) -->
     <script src="https://cdnjs.cloudflare.com/ajax/libs/marked/4.3.0/marked.min.js"></script>
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.9.0/styles/github-dark.min.css">
     <script src="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.9.0/highlight.min.js"></script>
     
-    <style>
-        :root { 
-            --bg-dark: #1e1e1e; 
-            --bg-panel: #252526; 
-            --accent: #007acc; 
-            --text: #cccccc; 
-            --border: #3e3e42; 
-        }
-        * { box-sizing: border-box; }
-        body { 
-            height: 100vh; margin: 0; 
-            background-color: var(--bg-dark); color: var(--text); 
-            font-family: 'Segoe UI', sans-serif; 
-            overflow: hidden; display: flex; flex-direction: column; 
-        }
-        
-        /* TOOLBAR */
-        #toolbar { 
-            height: 40px; background: #333; border-bottom: 1px solid #252526; 
-            display: flex; align-items: center; padding: 0 10px; gap: 8px; 
-        }
-        .tool-btn { 
-            background: #444; color: #fff; border: 1px solid #555; 
-            padding: 5px 10px; font-size: 13px; cursor: pointer; 
-            border-radius: 3px; display: flex; align-items: center; gap: 6px; 
-        }
-        .tool-btn:hover { background: #555; }
-        .tool-btn.primary { background: var(--accent); border-color: var(--accent); }
-        .tool-btn.magic { background: #6a1b9a; border-color: #8e24aa; } 
-        .tool-btn.gen { background: #2e7d32; border-color: #43a047; }
-        
-        /* LAYOUT */
-        #workspace { flex: 1; display: flex; overflow: hidden; position: relative; }
-        #sidebar { 
-            width: 220px; background: var(--bg-panel); 
-            border-right: 1px solid var(--border); 
-            display: flex; flex-direction: column; 
-        }
-        
-        /* EDITOR & TERMINAL */
-        #center-area { flex: 1; display: flex; flex-direction: column; min-width: 0; position: relative; }
-        #monaco-container { flex: 1; }
-        #terminal-panel { 
-            height: 30%; background: #1e1e1e; border-top: 1px solid var(--accent); 
-            display: none; flex-direction: column; 
-        }
-        #xterm-container { flex: 1; overflow: hidden; }
-
-        /* CHAT SIDEBAR (ENHANCED) */
-        #chat-panel { 
-            width: 350px; background: #202124; border-left: 1px solid var(--border); 
-            display: none; flex-direction: column; transition: width 0.3s ease; 
-        }
-        #chat-panel.active { display: flex; }
-        #chat-panel.wide { width: 50%; }
-        #chat-panel.full { width: 75%; }
-        
-        .chat-header { 
-            padding: 10px 15px; background: #2d2d2d; border-bottom: 1px solid #3e3e42; 
-            display: flex; justify-content: space-between; align-items: center; 
-        }
-        .chat-msgs { 
-            flex: 1; overflow-y: auto; padding: 20px; 
-            display: flex; flex-direction: column; gap: 20px; background: #1e1e1e; 
-        }
-        
-        .msg-row { display: flex; gap: 12px; max-width: 100%; }
-        .msg-row.user { justify-content: flex-end; }
-        .avatar { 
-            width: 32px; height: 32px; border-radius: 50%; 
-            display: flex; align-items: center; justify-content: center; 
-            font-size: 14px; flex-shrink: 0; margin-top: 5px;
-        }
-        .avatar.bot { background: #e65100; color: white; }
-        .avatar.user { background: #1976d2; color: white; }
-        
-        /* MARKDOWN STYLING */
-        .msg-bubble { 
-            padding: 12px 16px; border-radius: 8px; font-size: 14px; 
-            line-height: 1.6; max-width: 85%; word-wrap: break-word; 
-        }
-        .msg-row.bot .msg-bubble { background: #2d2d2d; color: #e0e0e0; border: 1px solid #3e3e42; }
-        .msg-row.user .msg-bubble { 
-            background: linear-gradient(135deg, #007acc, #005f9e); 
-            color: white; 
-        }
-        
-        /* Syntax Highlight & Copy Button */
-        .msg-bubble pre { 
-            background: #111; padding: 10px; border-radius: 6px; 
-            overflow-x: auto; margin: 10px 0; border: 1px solid #444; position: relative;
-        }
-        .msg-bubble code { font-family: 'Consolas', monospace; font-size: 13px; }
-        
-        /* Copy Button Style */
-        .copy-btn {
-            position: absolute; top: 5px; right: 5px;
-            background: #444; border: 1px solid #555; color: white;
-            padding: 4px 8px; border-radius: 4px; cursor: pointer;
-            font-size: 11px; opacity: 0.8;
-        }
-        .copy-btn:hover { opacity: 1; background: #666; }
-
-        .msg-bubble p { margin: 0 0 10px 0; }
-        .msg-bubble p:last-child { margin: 0; }
-        
-        /* MODALS */
-        .modal { 
-            position: absolute; top: 10%; left: 50%; transform: translateX(-50%); 
-            background: #252526; border: 1px solid var(--accent); z-index: 999; 
-            display: none; padding: 15px; box-shadow: 0 0 15px rgba(0,0,0,0.5); 
-            flex-direction: column; 
-        }
-        
-        /* FILE TREE */
-        .t-item { 
-            padding: 2px 10px; cursor: pointer; white-space: nowrap; 
-            overflow: hidden; text-overflow: ellipsis; font-size: 13px; 
-        }
-        .t-item:hover { background: #333; }
-        .is-dir { color: #fff; font-weight: bold; }
-        
-        /* STATUS BAR */
-        #statusbar { 
-            height: 22px; background: var(--accent); color: white; 
-            display: flex; align-items: center; padding: 0 10px; font-size: 12px; 
-        }
-    </style>
+    <link rel="stylesheet" href="/editor/assets/editor.css?v={{ asset_v['editor.css'] }}"/>
 </head>
 <body>
 
@@ -315,9 +347,10 @@ IDE_HTML = """
         </div>
 
         <!-- AI GEN MODAL -->
-        <div class="modal" id="gen-modal" style="width:400px; height:200px;">
+        <div class="modal" id="gen-modal" style="width:400px; min-height:200px;">
             <h3 style="margin-top:0; color:white;">AI Code Gen</h3>
             <textarea id="gen-prompt" placeholder="Describe code..." style="width:100%; height:80px; background:#1e1e1e; color:white; border:1px solid #444;"></textarea>
+            <pre id="gen-output" style="max-height:150px; overflow:auto; margin:8px 0 0; color:#9cdcfe; font-size:12px; white-space:pre-wrap;"></pre>
             <div style="margin-top:10px; text-align:right;">
                 <button class="tool-btn" onclick="document.getElementById('gen-modal').style.display='none'">Cancel</button>
                 <button class="tool-btn primary" onclick="submitGenCode()">Generate</button>
@@ -370,11 +403,164 @@ IDE_HTML = """
 <script>
     var project = "{{ project }}";
     var currentPath = {{ initial_file | tojson }};
+    var monacoBase = {{ assets.monaco | tojson }};
+</script>
+<script src="/editor/assets/editor.js?v={{ asset_v['editor.js'] }}"></script>
+</body>
+</html>
+"""
+
+IDE_CSS = """
+        :root { 
+            --bg-dark: #1e1e1e; 
+            --bg-panel: #252526; 
+            --accent: #007acc; 
+            --text: #cccccc; 
+            --border: #3e3e42; 
+        }
+        * { box-sizing: border-box; }
+        body { 
+            height: 100vh; margin: 0; 
+            background-color: var(--bg-dark); color: var(--text); 
+            font-family: 'Segoe UI', sans-serif; 
+            overflow: hidden; display: flex; flex-direction: column; 
+        }
+        
+        /* TOOLBAR */
+        #toolbar { 
+            height: 40px; background: #333; border-bottom: 1px solid #252526; 
+            display: flex; align-items: center; padding: 0 10px; gap: 8px; 
+        }
+        .tool-btn { 
+            background: #444; color: #fff; border: 1px solid #555; 
+            padding: 5px 10px; font-size: 13px; cursor: pointer; 
+            border-radius: 3px; display: flex; align-items: center; gap: 6px; 
+        }
+        .tool-btn:hover { background: #555; }
+        .tool-btn.primary { background: var(--accent); border-color: var(--accent); }
+        .tool-btn.magic { background: #6a1b9a; border-color: #8e24aa; } 
+        .tool-btn.gen { background: #2e7d32; border-color: #43a047; }
+        
+        /* LAYOUT */
+        #workspace { flex: 1; display: flex; overflow: hidden; position: relative; }
+        #sidebar { 
+            width: 220px; background: var(--bg-panel); 
+            border-right: 1px solid var(--border); 
+            display: flex; flex-direction: column; 
+        }
+        
+        /* EDITOR & TERMINAL */
+        #center-area { flex: 1; display: flex; flex-direction: column; min-width: 0; position: relative; }
+        #monaco-container { flex: 1; }
+        #terminal-panel { 
+            height: 30%; background: #1e1e1e; border-top: 1px solid var(--accent); 
+            display: none; flex-direction: column; 
+        }
+        #xterm-container { flex: 1; overflow: hidden; }
+
+        /* CHAT SIDEBAR (ENHANCED) */
+        #chat-panel { 
+            width: 350px; background: #202124; border-left: 1px solid var(--border); 
+            display: none; flex-direction: column; transition: width 0.3s ease; 
+        }
+        #chat-panel.active { display: flex; }
+        #chat-panel.wide { width: 50%; }
+        #chat-panel.full { width: 75%; }
+        
+        .chat-header { 
+            padding: 10px 15px; background: #2d2d2d; border-bottom: 1px solid #3e3e42; 
+            display: flex; justify-content: space-between; align-items: center; 
+        }
+        .chat-msgs { 
+            flex: 1; overflow-y: auto; padding: 20px; 
+            display: flex; flex-direction: column; gap: 20px; background: #1e1e1e; 
+        }
+        
+        .msg-row { display: flex; gap: 12px; max-width: 100%; }
+        .msg-row.user { justify-content: flex-end; }
+        .avatar { 
+            width: 32px; height: 32px; border-radius: 50%; 
+            display: flex; align-items: center; justify-content: center; 
+            font-size: 14px; flex-shrink: 0; margin-top: 5px;
+        }
+        .avatar.bot { background: #e65100; color: white; }
+        .avatar.user { background: #1976d2; color: white; }
+        
+        /* MARKDOWN STYLING */
+        .msg-bubble { 
+            padding: 12px 16px; border-radius: 8px; font-size: 14px; 
+            line-height: 1.6; max-width: 85%; word-wrap: break-word; 
+        }
+        .msg-row.bot .msg-bubble { background: #2d2d2d; color: #e0e0e0; border: 1px solid #3e3e42; }
+        .msg-row.user .msg-bubble { 
+            background: linear-gradient(135deg, #007acc, #005f9e); 
+            color: white; 
+        }
+        
+        /* Syntax Highlight & Copy Button */
+        .msg-bubble pre { 
+            background: #111; padding: 10px; border-radius: 6px; 
+            overflow-x: auto; margin: 10px 0; border: 1px solid #444; position: relative;
+        }
+        .msg-bubble code { font-family: 'Consolas', monospace; font-size: 13px; }
+        
+        /* Copy Button Style */
+        .copy-btn {
+            position: absolute; top: 5px; right: 5px;
+            background: #444; border: 1px solid #555; color: white;
+            padding: 4px 8px; border-radius: 4px; cursor: pointer;
+            font-size: 11px; opacity: 0.8;
+        }
+        .copy-btn:hover { opacity: 1; background: #666; }
+
+        .msg-bubble p { margin: 0 0 10px 0; }
+        .msg-bubble p:last-child { margin: 0; }
+        
+        /* MODALS */
+        .modal { 
+            position: absolute; top: 10%; left: 50%; transform: translateX(-50%); 
+            background: #252526; border: 1px solid var(--accent); z-index: 999; 
+            display: none; padding: 15px; box-shadow: 0 0 15px rgba(0,0,0,0.5); 
+            flex-direction: column; 
+        }
+        
+        /* FILE TREE */
+        .t-item { 
+            padding: 2px 10px; cursor: pointer; white-space: nowrap; 
+            overflow: hidden; text-overflow: ellipsis; font-size: 13px; 
+        }
+        .t-item:hover { background: #333; }
+        .is-dir { color: #fff; font-weight: bold; }
+        
+        /* STATUS BAR */
+        #statusbar { 
+            height: 22px; background: var(--accent); color: white; 
+            display: flex; align-items: center; padding: 0 10px; font-size: 12px; 
+        }
+"""
+
+IDE_JS = """
     var currentDir = ""; 
-    var editor, term;
+    var editor, term, fitAddon;
+
+    // One socket per tab: interactive pty + streamed one-shot Git commands
+    var termSock = (typeof io !== 'undefined') ? io('/editor/term') : null;
+    var termSockUp = false;
+    if(termSock) {
+        termSock.on('connect', () => { termSockUp = true; });
+        // Refused (origin check) or unreachable before it ever connected: HTTP streams from here on
+        termSock.on('connect_error', () => {
+            if(termSockUp || !termSock) return;
+            termSock.close(); termSock = null;
+            if(term) startLineTerminal();
+        });
+    }
+    var gitRuns = {}, gitRunSeq = 0;
+    var CHAT_LINES = 400;
+    var OUTLINE_RE = /^\\s*(?:async\\s+)?(?:def|class)\\s+\\w+/;  // same as the server's OUTLINE_RE
 
     // --- MONACO SETUP ---
-    require.config({ paths: { 'vs': 'https://cdnjs.cloudflare.com/ajax/libs/monaco-editor/0.44.0/min/vs' }});
+    require.config({ paths: { 'vs': monacoBase + '/vs' }});
     require(['vs/editor/editor.main'], function () {
         editor = monaco.editor.create(document.getElementById('monaco-container'), {
             value: "// Select a file to edit",
@@ -395,36 +581,66 @@ IDE_HTML = """
     });
 
     // --- FILE OPERATIONS ---
+    // Trailing-edge debounce: a burst of refreshes (create, git, navigation) makes one request
+    var treeTimer = null;
     function refreshTree(path) {
         if(path === undefined) path = currentDir;
         currentDir = path;
-        
+        clearTimeout(treeTimer);
+        treeTimer = setTimeout(() => loadTree(path), 100);
+    }
+
+    // Rows keyed by type+path: entries that survive a refresh keep their DOM node
+    var treeRows = new Map();
+    function treeRow(key, cls, text, nodePath, type) {
+        var d = treeRows.get(key);
+        if(!d) { d = document.createElement('div'); treeRows.set(key, d); }
+        if(d.className !== cls) d.className = cls;
+        if(text !== null && d.textContent !== text) d.textContent = text;
+        d.dataset.path = nodePath; d.dataset.type = type;
+        return d;
+    }
+
+    function loadTree(path) {
         var c = document.getElementById('file-tree');
-        c.innerHTML = '<div style="padding:5px; color:#aaa;">Loading...</div>';
+        if(!treeRows.size) c.innerHTML = '<div style="padding:5px; color:#aaa;">Loading...</div>';
 
         fetch('/editor/api/tree?project=' + encodeURIComponent(project) + '&path=' + encodeURIComponent(path))
         .then(r=>r.json()).then(nodes => {
-            c.innerHTML = "";
+            if(path !== currentDir) return; // superseded by a newer navigation
+            var rows = [], seen = new Set();
             if(path !== "") {
-                var up = document.createElement('div');
-                up.className = "t-item is-dir";
-                up.innerHTML = '<i class="fas fa-level-up-alt"></i> ..';
-                up.style.color = "#aaa";
                 var parts = path.split('/'); parts.pop();
-                var parent = parts.join('/');
-                up.onclick = () => refreshTree(parent);
-                c.appendChild(up);
+                var up = treeRow('up', 't-item is-dir', null, parts.join('/'), 'dir');
+                if(!up.firstChild) { up.innerHTML = '<i class="fas fa-level-up-alt"></i> ..'; up.style.color = "#aaa"; }
+                rows.push(up); seen.add('up');
             }
             nodes.forEach(n => {
-                var d = document.createElement('div');
-                d.className = "t-item " + (n.type==='dir'?'is-dir':'');
-                d.innerText = (n.type==='dir'?'📂 ':'📄 ') + n.name;
-                d.onclick = () => { n.type === 'dir' ? refreshTree(n.path) : loadFile(n.path); };
-                c.appendChild(d);
+                var key = n.type + ':' + n.path;
+                rows.push(treeRow(key, "t-item " + (n.type==='dir'?'is-dir':''), (n.type==='dir'?'📂 ':'📄 ') + n.name, n.path, n.type));
+                seen.add(key);
             });
+
+            // Drop stale rows and placeholders, then put rows in order touching only what moved
+            treeRows.forEach((el, key) => { if(!seen.has(key)) { el.remove(); treeRows.delete(key); } });
+            Array.from(c.children).forEach(el => { if(!('path' in el.dataset)) el.remove(); });
+            if(!c.firstChild) {
+                var frag = document.createDocumentFragment();
+                rows.forEach(d => frag.appendChild(d));
+                c.appendChild(frag);
+            } else {
+                rows.forEach((d, i) => { if(c.children[i] !== d) c.insertBefore(d, c.children[i] || null); });
+            }
         });
     }
 
+    // One delegated listener for every tree row
+    document.getElementById('file-tree').addEventListener('click', e => {
+        var row = e.target.closest('.t-item');
+        if(!row || !('path' in row.dataset)) return;
+        row.dataset.type === 'dir' ? refreshTree(row.dataset.path) : loadFile(row.dataset.path);
+    });
+
     function createItem(type) {
         var name = prompt("Enter Name for new " + (type==='dir'?'Folder':'File') + ":");
         if(!name) return;
@@ -441,7 +657,11 @@ IDE_HTML = """
     function loadFile(path) {
         document.getElementById('status-msg').innerText = "Loading " + path + "...";
         fetch('/editor/api/read?project=' + encodeURIComponent(project) + '&path=' + encodeURIComponent(path))
-        .then(r=>r.json()).then(d => {
+        .then(r => {
+            // File bodies come back as text/plain; only failures are JSON
+            var ct = r.headers.get('Content-Type') || '';
+            return ct.indexOf('application/json') === 0 ? r.json() : r.text().then(t => ({content: t}));
+        }).then(d => {
             if(d.error) { alert("Error: " + d.error); return; }
             var ext = path.split('.').pop();
             var lang = 'plaintext';
@@ -484,9 +704,11 @@ IDE_HTML = """
             var email = prompt("Enter Git Email:", d.email || "");
             if (email === null) return;
             
-            runGit(`config --global user.name "${name}"`);
-            setTimeout(() => runGit(`config --global user.email "${email}"`), 500);
-            setTimeout(() => runGit(`config --global --add safe.directory "*"`), 1000);
+            gitOut("\\n\\n$ git config --global user.name/user.email/safe.directory ...");
+            fetch('/editor/api/git/setup', {
+                method: 'POST', headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({ project: project, path: currentPath || "", name: name, email: email })
+            }).then(r => r.json()).then(d => gitOut("\\n" + (d.output || d.error)));
         });
     }
 
@@ -514,21 +736,81 @@ IDE_HTML = """
         });
     }
 
-    function runGit(args) {
+    // Coalesces streamed writes into one flush per animation frame
+    function frameBatcher(flush) {
+        var pending = '', queued = false;
+        return function(s) {
+            pending += s;
+            if(queued) return;
+            queued = true;
+            requestAnimationFrame(() => { queued = false; var p = pending; pending = ''; flush(p); });
+        };
+    }
+
+    // Reads a text/event-stream body off a fetch POST (EventSource can only GET)
+    function readEventStream(resp, onData, onDone) {
+        var reader = resp.body.getReader(), dec = new TextDecoder(), buf = '';
+        function pump() {
+            return reader.read().then(r => {
+                if(r.done) return;
+                buf += dec.decode(r.value, {stream: true});
+                var evts = buf.split('\\n\\n'); buf = evts.pop();
+                evts.forEach(ev => {
+                    var name = 'message', data = '';
+                    ev.split('\\n').forEach(l => {
+                        if(l.indexOf('event: ') === 0) name = l.slice(7);
+                        else if(l.indexOf('data: ') === 0) data += l.slice(6);
+                    });
+                    if(name === 'done') onDone(JSON.parse(data)); else onData(JSON.parse(data));
+                });
+                return pump();
+            });
+        }
+        return pump();
+    }
+
+    var gitOut = frameBatcher(s => {
         var out = document.getElementById('git-output');
-        out.innerText += `\\n\\n$ git ${args} ...`;
+        out.appendChild(document.createTextNode(s));
+        out.scrollTop = out.scrollHeight;
+    });
+
+    function gitRunOutput(run, data) {
+        if(!run.got) { gitOut("\\n"); run.got = true; }
+        gitOut(data);
+    }
+
+    function gitRunDone(run, code) {
+        if(code !== 0) gitOut("\\nCOMMAND FAILED (Exit " + code + ")");
+        else if(!run.got) gitOut("\\nDone (No output returned)");
+        if(run.args.includes('format-patch')) refreshTree();
+    }
+
+    function runGit(args) {
+        gitOut("\\n\\n$ git " + args + " ...");
         
         var ctxPath = currentPath || currentDir || "";
-        
-        fetch('/editor/api/term', {
+        var run = { args: args, got: false };
+
+        if(termSock && termSock.connected) {
+            var id = ++gitRunSeq;
+            gitRuns[id] = run;
+            termSock.emit('run', { id: id, project: project, cmd: 'git ' + args, path: ctxPath });
+            return;
+        }
+
+        fetch('/editor/api/term_stream', {
             method: 'POST',
             headers: {'Content-Type': 'application/json'},
             body: JSON.stringify({ project: project, cmd: 'git ' + args, path: ctxPath })
-        }).then(r => r.json()).then(d => {
-            if(!d.output.trim()) d.output = "Done (No output returned)";
-            out.innerText += "\\n" + d.output;
-            out.scrollTop = out.scrollHeight;
-            if(args.includes('format-patch')) refreshTree();
+        }).then(r => readEventStream(r, d => gitRunOutput(run, d), c => gitRunDone(run, c)));
+    }
+
+    if(termSock) {
+        termSock.on('run_output', m => gitRunOutput(gitRuns[m.id], m.data));
+        termSock.on('run_done', m => {
+            var run = gitRuns[m.id]; delete gitRuns[m.id];
+            gitRunDone(run, m.code);
         });
     }
 
@@ -616,40 +898,78 @@ IDE_HTML = """
         
         var b = document.getElementById('chat-msgs');
         
-        // Render User Msg
-        var userHtml = '<div class="msg-row user"><div class="msg-bubble">' + parseMarkdownSafe(txt) + '</div><div class="avatar user"><i class="fas fa-user"></i></div></div>';
-        b.innerHTML += userHtml;
+        // Render User Msg (appended as nodes; the text goes in as text, never as HTML)
+        var userRow = document.createElement('div');
+        userRow.className = 'msg-row user';
+        userRow.innerHTML = '<div class="msg-bubble" style="white-space:pre-wrap;"></div><div class="avatar user"><i class="fas fa-user"></i></div>';
+        userRow.firstChild.textContent = txt;
+        b.appendChild(userRow);
         i.value = '';
         b.scrollTop = b.scrollHeight;
 
         // Get Editor Content (Safe)
-        var codeVal = "";
-        try { if(editor) codeVal = editor.getValue(); } catch(e) {}
+        var codeVal = "", curLine = 1, codeStart = 1, total = 0, selText = "", outline = "";
+        try {
+            if(editor) {
+                // Only post the lines around the cursor; the server windows them again by tokens
+                var model = editor.getModel(); total = model.getLineCount();
+                curLine = editor.getPosition().lineNumber;
+                codeStart = Math.max(1, curLine - CHAT_LINES);
+                var codeEnd = Math.min(total, curLine + CHAT_LINES);
+                codeVal = model.getValueInRange({startLineNumber:codeStart, startColumn:1, endLineNumber:codeEnd, endColumn:model.getLineMaxColumn(codeEnd)});
+                // The outline covers the whole buffer, not just the posted slice
+                if(codeStart > 1 || codeEnd < total) {
+                    var all = model.getLinesContent(), defs = [];
+                    for(var n = 0; n < all.length; n++) if(OUTLINE_RE.test(all[n])) defs.push((n + 1) + ': ' + all[n].trim());
+                    outline = defs.join('\\n');
+                }
+                selText = editor.getModel().getValueInRange(editor.getSelection());
+            }
+        } catch(e) {}
 
         fetch('/editor/api/chat_context', {
             method:'POST', headers:{'Content-Type':'application/json'},
-            body:JSON.stringify({ project:project, message:txt, code_context:codeVal, current_file:currentPath })
+            body:JSON.stringify({ project:project, message:txt, code_context:codeVal, code_start:codeStart, total_lines:total, outline:outline, current_file:currentPath, current_line:curLine, selection:selText })
         }).then(r=>r.json()).then(d=>{
-            // Render Bot Msg
-            var botText = parseMarkdownSafe(d.response);
-            var botHtml = '<div class="msg-row bot"><div class="avatar bot"><i class="fas fa-robot"></i></div><div class="msg-bubble">'+botText+'</div></div>';
-            b.innerHTML += botHtml;
-            
-            // Syntax Highlight (Try Safe)
-            if(typeof hljs !== 'undefined') {
-                try {
-                    b.querySelectorAll('pre code').forEach((block) => {
-                        hljs.highlightElement(block);
-                    });
-                } catch(e) {}
+            // Render Bot Msg (filled in as the reply streams in)
+            var row = document.createElement('div');
+            row.className = 'msg-row bot';
+            row.innerHTML = '<div class="avatar bot"><i class="fas fa-robot"></i></div><div class="msg-bubble"></div>';
+            b.appendChild(row);
+            var bubble = row.querySelector('.msg-bubble');
+
+            function finish(text) {
+                bubble.innerHTML = parseMarkdownSafe(text);
+                
+                // Syntax Highlight (Try Safe)
+                if(typeof hljs !== 'undefined') {
+                    try {
+                        bubble.querySelectorAll('pre code').forEach((block) => {
+                            hljs.highlightElement(block);
+                        });
+                    } catch(e) {}
+                }
+                
+                // Add Copy Buttons
+                addCopyButtons();
+                
+                b.scrollTop = b.scrollHeight;
             }
-            
-            // Add Copy Buttons
-            addCopyButtons();
-            
-            b.scrollTop = b.scrollHeight;
+
+            if(!d.job_id) { finish(d.response); return; }
+            var reply = '', es = new EventSource('/editor/api/ai_stream/' + d.job_id);
+            es.onmessage = function(ev) {
+                reply += JSON.parse(ev.data);
+                bubble.innerHTML = parseMarkdownSafe(reply);
+                b.scrollTop = b.scrollHeight;
+            };
+            es.addEventListener('done', function() { es.close(); finish(reply); });
+            es.addEventListener('failed', function(ev) { es.close(); finish("AI Error: " + JSON.parse(ev.data)); });
         }).catch(err => {
-            b.innerHTML += '<div style="color:red; font-size:12px; padding:10px;">Network Error: ' + err + '</div>';
+            var errRow = document.createElement('div');
+            errRow.style.cssText = 'color:red; font-size:12px; padding:10px;';
+            errRow.textContent = 'Network Error: ' + err;
+            b.appendChild(errRow);
         });
     }
 
@@ -657,14 +977,34 @@ IDE_HTML = """
     
     function submitGenCode() {
         var p = document.getElementById('gen-prompt').value;
+        var out = document.getElementById('gen-output');
+        out.textContent = "Generating...";
         fetch('/editor/api/ai_gen', {
             method:'POST', headers:{'Content-Type':'application/json'},
             body:JSON.stringify({ prompt:p, language: editor.getModel().getLanguageId() })
         }).then(r=>r.json()).then(d=>{
-            if(d.code) {
-                editor.executeEdits("ai", [{ range: editor.getSelection(), text: d.code }]);
-                document.getElementById('gen-modal').style.display='none';
-            }
+            if(d.error) { out.textContent = "Error: " + d.error; return; }
+            // Job runs server-side; output is written into the editor as it arrives, one edit per frame.
+            // The first batch replaces the selection, later ones go after the inserted text.
+            var at = editor.getSelection(), es = new EventSource('/editor/api/ai_stream/' + d.job_id);
+            editor.pushUndoStop();
+            out.textContent = "Inserting...";
+            var genOut = frameBatcher(s => editor.executeEdits("ai", [{ range: at, text: s }], inv => {
+                var e = inv[0].range;
+                at = { startLineNumber: e.endLineNumber, startColumn: e.endColumn, endLineNumber: e.endLineNumber, endColumn: e.endColumn };
+                return null;
+            }));
+            es.onmessage = function(ev) { genOut(JSON.parse(ev.data)); };
+            es.addEventListener('done', function() {
+                es.close();
+                // Queued after genOut's frame, so the last batch is in before the undo stop
+                requestAnimationFrame(() => {
+                    editor.pushUndoStop();
+                    document.getElementById('gen-modal').style.display='none';
+                    out.textContent = '';
+                });
+            });
+            es.addEventListener('failed', function(ev) { es.close(); out.textContent = "Error: " + JSON.parse(ev.data); });
         });
     }
 
@@ -672,81 +1012,207 @@ IDE_HTML = """
         var code = editor.getModel().getValueInRange(editor.getSelection()) || editor.getValue();
         if(!code.trim()) return alert("Select code first");
         document.getElementById('explain-modal').style.display='block';
-        document.getElementById('explain-content').innerText = "Thinking...";
+        var box = document.getElementById('explain-content');
+        box.innerText = "Thinking...";
         fetch('/editor/api/explain', {
             method:'POST', headers:{'Content-Type':'application/json'},
             body:JSON.stringify({ code:code })
-        }).then(r=>r.json()).then(d=> document.getElementById('explain-content').innerText = d.explanation);
+        }).then(r=>r.json()).then(d=>{
+            if(!d.job_id) { box.innerText = d.explanation; return; }
+            var text = '', es = new EventSource('/editor/api/ai_stream/' + d.job_id);
+            var show = frameBatcher(s => { text += s; box.innerText = text; });
+            es.onmessage = function(ev) { show(JSON.parse(ev.data)); };
+            es.addEventListener('done', function() { es.close(); });
+            es.addEventListener('failed', function(ev) { es.close(); box.innerText = JSON.parse(ev.data); });
+        });
     }
 
     function initTerminal() {
         try {
             if(typeof Terminal !== 'undefined') {
-                Terminal.applyAddon(fit);
                 term = new Terminal({ fontSize: 13, theme: { background: '#1e1e1e' } });
+                fitAddon = new FitAddon.FitAddon();
+                term.loadAddon(fitAddon);
                 term.open(document.getElementById('xterm-container'));
-                term.fit();
-                term.write('$ ');
-                var cmd="";
-                term.on('data', k=>{
-                    if(k.charCodeAt(0)===13){
-                        term.write('\\r\\n');
-                        if(cmd.trim()){
-                             fetch('/editor/api/term', {
-                                method:'POST',headers:{'Content-Type':'application/json'},
-                                body:JSON.stringify({project:project, cmd:cmd.trim()})
-                             }).then(r=>r.json()).then(d=>{
-                                 term.write(d.output.replace(/\\n/g,'\\r\\n'));
-                                 term.write('\\r\\n$ ');
-                             });
-                        } else term.write('$ ');
-                        cmd="";
-                    } else if(k.charCodeAt(0)===127){
-                        if(cmd.length>0){ cmd=cmd.slice(0,-1); term.write('\\b \\b'); }
-                    } else { cmd+=k; term.write(k); }
-                });
+                fitAddon.fit();
+
+                // Each frame's batch is one DEC 2026 synchronized update: painted whole, no tearing
+                var termOut = frameBatcher(s => term.write('\\x1b[?2026h' + s + '\\x1b[?2026l'));
+
+                // Preferred path: one socket + server-side pty, keystrokes stream both ways
+                if(termSock) {
+                    var startPty = () => termSock.emit('start', {project: project, cols: term.cols, rows: term.rows});
+                    if(termSock.connected) startPty();
+                    termSock.on('connect', startPty);
+                    termSock.on('output', m => termOut(m.data));
+                    term.onData(k => { if(termSock) termSock.emit('input', {data: k}); });
+                    // fitAddon.fit() on panel/window resize changes cols/rows; the pty follows
+                    term.onResize(sz => { if(termSock) termSock.emit('resize', {cols: sz.cols, rows: sz.rows}); });
+                    window.addEventListener('resize', () => { if(isTermVisible()) fitAddon.fit(); });
+                    return;
+                }
+                startLineTerminal();
             } else {
                 document.getElementById('xterm-container').innerHTML = "<div style='padding:10px; color:orange'>Terminal Lib offline</div>";
             }
         } catch(e) { console.log("Terminal failed: " + e); }
     }
     
+    // Fallback: line-buffered, output streamed back per command
+    function startLineTerminal() {
+        var termOut = frameBatcher(s => term.write('\\x1b[?2026h' + s + '\\x1b[?2026l'));
+        term.write('$ ');
+        var cmd="";
+        term.onData(k=>{
+            if(termSock) return;  // the pty socket owns the keys
+            if(k.charCodeAt(0)===13){
+                term.write('\\r\\n');
+                if(cmd.trim()){
+                     fetch('/editor/api/term_stream', {
+                        method:'POST',headers:{'Content-Type':'application/json'},
+                        body:JSON.stringify({project:project, cmd:cmd.trim()})
+                     }).then(r => readEventStream(r,
+                         d => termOut(d.replace(/\\n/g,'\\r\\n')),
+                         c => termOut((c !== 0 ? '\\r\\n[Exit ' + c + ']' : '') + '\\r\\n$ ')));
+                } else term.write('$ ');
+                cmd="";
+            } else if(k.charCodeAt(0)===127){
+                if(cmd.length>0){ cmd=cmd.slice(0,-1); term.write('\\b \\b'); }
+            } else { cmd+=k; term.write(k); }
+        });
+    }
+
+    function isTermVisible() {
+        return document.getElementById('terminal-panel').style.display === 'flex';
+    }
+
     function toggleTerminal() { 
         var t = document.getElementById('terminal-panel');
         t.style.display = (t.style.display === 'flex' ? 'none' : 'flex');
-        if(t.style.display === 'flex' && term) term.fit();
+        if(t.style.display === 'flex' && fitAddon) fitAddon.fit();
     }
-</script>
-</body>
-</html>
 """
 
 # --- BACKEND ENDPOINTS ---
 
+# --- FRONT-END ASSETS ---
+# Monaco/xterm/FontAwesome come from a same-origin bundle (built into the image, with
+# .br/.gz siblings) when installed, and from cdnjs otherwise
+EDITOR_STATIC_DIR = os.environ.get('EDITOR_STATIC_DIR', '/opt/editor-static')
+STATIC_CACHE = 'public, max-age=31536000, immutable'
+CDN_ASSETS = {
+    'monaco': 'https://cdnjs.cloudflare.com/ajax/libs/monaco-editor/0.44.0/min',
+    'xterm': 'https://cdn.jsdelivr.net/npm/xterm@5.3.0',
+    'xterm_fit': 'https://cdn.jsdelivr.net/npm/xterm-addon-fit@0.8.0',
+    'fontawesome': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0',
+}
+
+def bundle_version(name):
+    """URL segment for an installed bundle dir (its mtime, new on every image build that installs it), else None."""
+    try: st = os.stat(os.path.join(EDITOR_STATIC_DIR, name))
+    except OSError: return None
+    return format(st.st_mtime_ns, 'x') if stat.S_ISDIR(st.st_mode) else None
+
+# Bundle URLs carry bundle_version, so STATIC_CACHE can be permanent: a Monaco/xterm bump gets new URLs
+ASSETS = {}
+for _name, _url in CDN_ASSETS.items():
+    _v = bundle_version(_name)
+    ASSETS[_name] = f"/editor/static/{_v}/{_name}" if _v else _url
+
+@editor_bp.route('/editor/static/<version>/<path:filename>')
+def editor_static(version, filename):
+    try: path = safe_join(EDITOR_STATIC_DIR, filename)
+    except PermissionError: abort(404)
+    if not os.path.isfile(path): abort(404)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    accept = request.headers.get('Accept-Encoding', '')
+    # Serve the precompressed sibling when the client takes it
+    for enc, ext in (('br', '.br'), ('gzip', '.gz')):
+        if enc in accept and os.path.isfile(path + ext):
+            r = send_file(path + ext, mimetype=mimetype, conditional=True)
+            r.headers['Content-Encoding'] = enc
+            break
+    else:
+        r = send_file(path, mimetype=mimetype, conditional=True)
+    r.headers['Vary'] = 'Accept-Encoding'
+    r.headers['Cache-Control'] = STATIC_CACHE
+    return r
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+
+def minify(src):
+    """Drops indentation and blank lines; line breaks stay so JS (// comments, ASI) is untouched."""
+    return "\n".join(l.strip() for l in src.splitlines() if l.strip())
+
+# { name: (mimetype, body, gzip_body, version) } - built once; URLs carry the version so caching can be permanent
+EDITOR_ASSETS = {}
+for _name, _mimetype, _src in (('editor.css', 'text/css', CSS_COMMENT_RE.sub('', IDE_CSS)),
+                               ('editor.js', 'application/javascript', IDE_JS)):
+    _body = minify(_src).encode('utf-8')
+    EDITOR_ASSETS[_name] = (_mimetype, _body, gzip.compress(_body, 6), hashlib.md5(_body).hexdigest()[:10])
+ASSET_VERSIONS = {name: a[3] for name, a in EDITOR_ASSETS.items()}
+
+@editor_bp.route('/editor/assets/<name>')
+def editor_asset(name):
+    if name not in EDITOR_ASSETS: abort(404)
+    mimetype, body, gz, version = EDITOR_ASSETS[name]
+    use_gz = 'gzip' in request.headers.get('Accept-Encoding', '')
+    r = current_app.response_class(gz if use_gz else body, mimetype=mimetype)
+    if use_gz: r.headers['Content-Encoding'] = 'gzip'
+    r.headers['Vary'] = 'Accept-Encoding'
+    r.headers['Cache-Control'] = STATIC_CACHE
+    r.set_etag(version)
+    return r.make_conditional(request)
+
+# Compiled once on first use; render_template_string would re-parse IDE_HTML per request
+_IDE_TEMPLATE = None
+
+def get_ide_template():
+    """Returns IDE_HTML minified and compiled with the app's Jinja environment."""
+    global _IDE_TEMPLATE
+    if _IDE_TEMPLATE is None:
+        _IDE_TEMPLATE = current_app.jinja_env.from_string(minify(IDE_HTML))
+    return _IDE_TEMPLATE
+
+@functools.lru_cache(maxsize=128)
+def render_ide(project, initial_file):
+    """Rendered page and its gzip body, cached per (project, file) since nothing else varies."""
+    html = get_ide_template().render(project=project, assets=ASSETS, asset_v=ASSET_VERSIONS, initial_file=initial_file).encode('utf-8')
+    return html, gzip.compress(html, 6)
+
 @editor_bp.route('/editor/view/<project>/')
 @editor_bp.route('/editor/view/<project>/<path:filepath>')
 def open_editor(project, filepath=""):
-    return render_template_string(IDE_HTML, project=project, initial_file=filepath if filepath else "None")
+    html, gz = render_ide(project, filepath if filepath else "None")
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        r = current_app.response_class(gz, mimetype='text/html')
+        r.headers['Content-Encoding'] = 'gzip'
+    else:
+        r = current_app.response_class(html, mimetype='text/html')
+    r.headers['Vary'] = 'Accept-Encoding'
+    return r
 
 @editor_bp.route('/editor/api/read')
 def read_file():
     project = request.args.get('project')
     path = request.args.get('path')
     root, _ = get_config_safe(project)
-    if not root: return jsonify({'error': 'Project not found'})
-    abs_path = os.path.join(root, path)
-    if not os.path.exists(abs_path): return jsonify({'error': f"File not found: {path}"})
-    if os.path.isdir(abs_path): return jsonify({'error': "Cannot open directory"})
-    try:
-        with open(abs_path, 'r', errors='replace') as f: return jsonify({'content': f.read()})
-    except Exception as e: return jsonify({'error': str(e)})
+    if not root: return ojson({'error': 'Project not found'})
+    try: abs_path = safe_join(root, path)
+    except PermissionError as e: return ojson({'error': str(e)})
+    # Raw body via send_file (sendfile(2) where available) instead of read + JSON escape.
+    # send_file does the only stat and the open; a missing file or directory surfaces as their errors
+    try: return send_file(abs_path, mimetype='text/plain', conditional=True)
+    except FileNotFoundError: return ojson({'error': f"File not found: {path}"})
+    except IsADirectoryError: return ojson({'error': "Cannot open directory"})
+    except Exception as e: return ojson({'error': str(e)})
 
 # --- NEW: SMART CHAT CONTEXT ---
 @editor_bp.route('/editor/api/chat_context', methods=['POST'])
 def chat_context():
-    if not AI_AVAILABLE: return jsonify({'response': "AI unavailable"})
+    if not AI_AVAILABLE: return ojson({'response': "AI unavailable"})
     
-    data = request.json
+    data = json_body()
     project = data.get('project')
     user_msg = data.get('message', '')
     current_code = data.get('code_context', '')
@@ -785,16 +1251,32 @@ def chat_context():
     except:
         pass
 
-    # 3. ADD LINE NUMBERS
+    # 3. ADD LINE NUMBERS (token-bounded window around the cursor + outline of the rest)
+    # The client posts a slice of the buffer; code_start is the file line number of its first line
     lines = current_code.split('\n')
-    numbered_code = "\n".join([f"{i+1}: {line}" for i, line in enumerate(lines)])
+    first = max((data.get('code_start') or 1) - 1, 0)
+    total = max(data.get('total_lines') or 0, first + len(lines))
+    cursor_line = data.get('current_line') or 1
+    lo, hi = code_window(lines, cursor_line - 1 - first)
+    numbered_code = "\n".join(f"{first+i+1}: {lines[i]}" for i in range(lo, hi + 1))
+    if lo > 0 or hi < len(lines) - 1 or len(lines) < total:
+        # Whole-file outline from the client when it sent one; otherwise say which lines it covers
+        outline = data.get('outline')
+        if outline and isinstance(outline, str):
+            outline = "--- FILE OUTLINE ---\n" + "\n".join(outline.split("\n")[:OUTLINE_MAX_LINES])
+        else:
+            outline = f"--- OUTLINE OF LINES {first+1}-{first+len(lines)} ONLY ---\n{code_outline(lines, first)}"
+        numbered_code = f"(Lines {first+lo+1}-{first+hi+1} of {total}, cursor at {cursor_line})\n{numbered_code}\n\n{outline}"
+    selection = data.get('selection', '')
+    if selection:
+        numbered_code += f"\n\n--- SELECTED TEXT ---\n{selection}"
     
     # 4. MANAGE HISTORY
     if project not in chat_histories:
         chat_histories[project] = []
     
     # 5. BUILD PROMPT
-    from qgenie import QGenieClient, ChatMessage
+    from qgenie import ChatMessage
     
     sys_prompt = (
         f"You are a Senior Developer. Project: {project}\n"
@@ -812,103 +1294,365 @@ def chat_context():
     # Send System Prompt + Last 8 Messages
     messages_to_send = [ChatMessage(role="system", content=sys_prompt)] + chat_histories[project][-8:]
     
-    try:
-        # Call AI
-        response = QGenieClient().chat(messages=messages_to_send)
-        bot_reply = response.first_content
-        
-        # Save Reply
-        chat_histories[project].append(ChatMessage(role="assistant", content=bot_reply))
-        
-        return jsonify({'response': bot_reply})
-        
-    except Exception as e:
-        return jsonify({'response': f"AI Error: {str(e)}"})
+    def produce(emit):
+        try:
+            # Call AI
+            response = ai_helper.get_client().chat(messages=messages_to_send)
+            bot_reply = response.first_content
+            
+            # Save Reply
+            chat_histories[project].append(ChatMessage(role="assistant", content=bot_reply))
+        except Exception as e:
+            bot_reply = f"AI Error: {str(e)}"
+        emit(bot_reply)
+    
+    # Reply is streamed from /editor/api/ai_stream/<job_id>
+    return ojson({'job_id': start_ai_job(produce)})
 
 @editor_bp.route('/editor/api/chat_clear', methods=['POST'])
 def chat_clear():
-    p = request.json.get('project')
+    p = json_body().get('project')
     if p in chat_histories: del chat_histories[p]
-    return jsonify({'status':'ok'})
+    return ojson({'status':'ok'})
+
+# --- SAVE COALESCING ---
+# { abs_path: state } - present while a save of that file is writing. A save that arrives mid-write
+# parks its content (replacing older parked content) and waits; the writer then writes the newest
+# parked content, so a burst costs at most two writes and a lone save never waits. Every request is
+# answered only once its content, or newer content, is on disk - or with the error that stopped it.
+#   state = {'data': parked bytes or None, 'ticket': newest parked ticket,
+#            'done': highest ticket on disk, 'failed': (highest failed ticket, error)}
+pending_saves = {}
+save_cond = threading.Condition()
+save_ticket = itertools.count(1)
+UMASK = os.umask(0); os.umask(UMASK)  # read once at import; os.umask has no read-only form
+
+def write_atomic(abs_path, data):
+    """Write to a unique hidden sibling (mkstemp: O_EXCL), fsync once, then swap it in atomically."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(abs_path), prefix='.' + os.path.basename(abs_path) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush(); os.fsync(f.fileno())
+        # mkstemp files are 0600: keep the original's mode (exec bits etc.), umask default for new files
+        try: mode = stat.S_IMODE(os.stat(abs_path).st_mode)
+        except FileNotFoundError: mode = 0o666 & ~UMASK
+        os.chmod(tmp, mode)
+        os.replace(tmp, abs_path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
 
 @editor_bp.route('/save_file', methods=['POST'])
 def save_file():
-    d=request.json
+    d=json_body()
     r,_=get_config_safe(d['project'])
     try:
-        with open(os.path.join(r, d['path']), 'w') as f: f.write(d['content'])
-        return jsonify({'status':'ok'})
-    except Exception as e: return jsonify({'error':str(e)})
+        abs_path = safe_join(r, d['path'])
+        data = d['content'].encode('utf-8')
+        with save_cond:
+            ticket = next(save_ticket)
+            st = pending_saves.get(abs_path)
+            if st is not None:
+                # A write is in flight: it picks this content up next; wait until that has happened
+                st['data'], st['ticket'] = data, ticket
+                while st['done'] < ticket and st['failed'][0] < ticket: save_cond.wait()
+                if st['done'] >= ticket: return ojson({'status':'ok'})
+                return ojson({'error': st['failed'][1]})
+            pending_saves[abs_path] = st = {'data': None, 'ticket': 0, 'done': 0, 'failed': (0, '')}
+        while True:
+            try: write_atomic(abs_path, data)
+            except BaseException as e:
+                with save_cond:
+                    # Fail this write and everything parked behind it; nothing is dropped silently
+                    st['failed'] = (max(ticket, st['ticket']), str(e))
+                    del pending_saves[abs_path]
+                    save_cond.notify_all()
+                raise
+            with save_cond:
+                st['done'] = ticket
+                save_cond.notify_all()
+                if st['data'] is None:
+                    del pending_saves[abs_path]; break
+                data, ticket, st['data'] = st['data'], st['ticket'], None
+        invalidate_tree(abs_path)
+        return ojson({'status':'ok'})
+    except Exception as e: return ojson({'error':str(e)})
 
 @editor_bp.route('/editor/api/tree')
 def get_tree():
     p = request.args.get('project')
     path = request.args.get('path', '')
     r, _ = get_config_safe(p)
-    if not r: return jsonify([])
-    t = os.path.join(r, path)
-    if not os.path.exists(t): return jsonify([])
-    n = []
-    for i in os.listdir(t):
-        if i.startswith('.'): continue
-        fp = os.path.join(t, i)
-        n.append({'name':i, 'path':os.path.join(path, i), 'type':'dir' if os.path.isdir(fp) else 'file'})
-    n.sort(key=lambda x:(x['type']!='dir', x['name']))
-    return jsonify(n)
+    if not r: return ojson([])
+    try:
+        t = safe_join(r, path)
+        mtime = os.stat(t).st_mtime_ns
+    except OSError: return ojson([])
+
+    # Directory mtime is the ETag: an unchanged folder costs one stat and an empty 304
+    etag = str(mtime)
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = ojson(list_dir(t, path, mtime))
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+def list_dir(t, path, mtime):
+    """Sorted, paged listing of abs dir t (shown relative to path), served from tree_cache when valid."""
+    n = cached_listing(t, mtime)
+    if n is None:
+        n = []
+        # scandir's DirEntry.is_dir() reuses the dirent type, no extra stat per entry
+        with os.scandir(t) as it:
+            for e in it:
+                if e.name.startswith('.'): continue
+                n.append({'name':e.name, 'path':os.path.join(path, e.name), 'type':'dir' if e.is_dir() else 'file'})
+        n.sort(key=lambda x:(x['type']!='dir', x['name']))
+        store_listing(t, mtime, n)
+
+    # Optional paging for huge directories (?offset=&limit=), full listing by default
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    if offset or limit is not None:
+        n = n[offset:offset + limit if limit is not None else None]
+    return n
 
 @editor_bp.route('/editor/api/ai_gen', methods=['POST'])
 def ai_gen():
-    if not AI_AVAILABLE: return jsonify({'error':"AI unavailable"})
-    try:
-        from qgenie import QGenieClient, ChatMessage
-        r = QGenieClient().chat(messages=[ChatMessage(role="user", content=f"Write {request.json.get('language')} code: {request.json.get('prompt')}. Only code.")])
-        return jsonify({'code': r.first_content.replace('```python','').replace('```','').strip()})
-    except Exception as e: return jsonify({'error':str(e)})
+    if not AI_AVAILABLE: return ojson({'error':"AI unavailable"})
+    d = json_body()
+    def produce(emit):
+        from qgenie import ChatMessage
+        r = ai_helper.get_client().chat(messages=[ChatMessage(role="user", content=f"Write {d.get('language')} code: {d.get('prompt')}. Only code.")])
+        emit(r.first_content.replace('```python','').replace('```','').strip())
+    return ojson({'job_id': start_ai_job(produce)})
+
+@editor_bp.route('/editor/api/ai_stream/<job_id>')
+def ai_stream(job_id):
+    job = AI_JOBS.get(job_id)
+    if not job: return ojson({'error': 'Unknown job'}, 404)
+    def events():
+        sent = 0
+        while True:
+            # Read status first: the worker appends chunks before flipping it
+            status = job['status']
+            # Everything produced since the last tick goes out as one event
+            if sent < len(job['chunks']):
+                pending = job['chunks'][sent:]
+                sent += len(pending)
+                yield f"data: {json.dumps(''.join(pending))}\n\n"
+            if status != 'running':
+                AI_JOBS.pop(job_id, None)
+                yield f"event: {status}\ndata: {json.dumps(job['error'])}\n\n"
+                return
+            time.sleep(AI_STREAM_TICK)
+    return current_app.response_class(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 @editor_bp.route('/editor/api/explain', methods=['POST'])
 def explain():
-    if not AI_AVAILABLE: return jsonify({'explanation':"AI unavailable"})
-    try:
-        from qgenie import QGenieClient, ChatMessage
-        r = QGenieClient().chat(messages=[
+    if not AI_AVAILABLE: return ojson({'explanation':"AI unavailable"})
+    code = json_body().get('code','')
+    def produce(emit):
+        from qgenie import ChatMessage
+        r = ai_helper.get_client().chat(messages=[
             ChatMessage(role="system", content="Explain code."),
-            ChatMessage(role="user", content=request.json.get('code',''))
+            ChatMessage(role="user", content=code)
         ])
-        return jsonify({'explanation': r.first_content})
-    except Exception as e: return jsonify({'explanation':str(e)})
+        emit(r.first_content)
+    # Explanation is streamed from /editor/api/ai_stream/<job_id>
+    return ojson({'job_id': start_ai_job(produce)})
+
+TERM_TIMEOUT = 120  # seconds before a one-shot (Git panel / term) command is killed
+TERM_MAX_OUTPUT = 1 << 20  # bytes of output kept before the command is killed
+
+# FORCE GIT TO AVOID PAGER (prevents hangs) - built once, handed read-only to every child
+BASE_ENV = {**os.environ, 'GIT_PAGER': 'cat'}
+PTY_ENV = {**BASE_ENV, 'TERM': 'xterm'}
+# Any of these (or a leading VAR=value) needs /bin/sh; plain commands are exec'd directly
+SHELL_META_RE = re.compile(r'[|&;<>()$`\\*?\[\]{}~!#\n]')
+
+def spawn(cmd, **kw):
+    """Popen for a command line: direct exec when it is a plain argv, via /bin/sh otherwise."""
+    if not SHELL_META_RE.search(cmd):
+        try:
+            argv = shlex.split(cmd)
+            if argv and '=' not in argv[0]:
+                return subprocess.Popen(argv, env=BASE_ENV, **kw)
+        except (ValueError, OSError):
+            pass  # unbalanced quotes, or a shell builtin such as cd
+    return subprocess.Popen(cmd, shell=True, env=BASE_ENV, **kw)
 
 @editor_bp.route('/editor/api/term', methods=['POST'])
 def term():
-    d = request.json
+    d = json_body()
     
     # 1. SMART CONTEXT DETECTION (Fixes Exit 128)
     cwd = get_cwd_context(d['project'], d.get('path'))
 
     try:
-        # FORCE GIT TO AVOID PAGER (prevents hangs)
-        env = os.environ.copy()
-        env['GIT_PAGER'] = 'cat'
-
-        # Use subprocess.run to capture stderr and avoid crashes on non-utf8 chars
-        res = subprocess.run(
-            d['cmd'], 
-            shell=True, 
-            cwd=cwd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.STDOUT, # Combine stdout/stderr
-            env=env
-        )
-        
-        # KEY FIX: errors='replace' prevents 0xf6 crash
-        output = res.stdout.decode('utf-8', errors='replace')
-        
-        if res.returncode != 0:
-            return jsonify({'output': f"COMMAND FAILED (Exit {res.returncode}):\n{output}"})
+        # Same deadline/output cap as the streamed path; the exit code comes last
+        *parts, code = stream_command(d['cmd'], cwd)
+        output = ''.join(parts)
+        if code != 0:
+            return ojson({'output': f"COMMAND FAILED (Exit {code}):\n{output}"})
             
-        return jsonify({'output': output})
+        return ojson({'output': output})
+
+    except Exception as e:
+        return ojson({'output': f"Execution Error: {str(e)}"})
 
-    except Exception as e: 
-        return jsonify({'output': f"Execution Error: {str(e)}"})
+def kill_group(p):
+    """SIGKILL p's whole process group; fine if it has already exited."""
+    try: os.killpg(p.pid, signal.SIGKILL)
+    except ProcessLookupError: pass
+
+def stream_command(cmd, cwd):
+    """Yields cmd's decoded output as it arrives, then its exit code (an int) last.
+
+    The command gets no stdin and its own process group, which is killed once
+    TERM_TIMEOUT passes or TERM_MAX_OUTPUT is exceeded (pagers, editors and
+    credential prompts would otherwise block a worker forever).
+    """
+    p = spawn(cmd, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
+    # Large raw reads straight off the fd: one chunk per read, never 1-byte reads
+    decoder = codecs.getincrementaldecoder("utf-8")(errors='replace')
+    fd = p.stdout.fileno()
+    total = 0
+    deadline = time.monotonic() + TERM_TIMEOUT
+    timed_out = f"\n[killed: timeout after {TERM_TIMEOUT}s]"
+    killed = False
+    try:
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                kill_group(p); killed = True
+                yield timed_out
+                break
+            if not select.select([fd], [], [], left)[0]: continue
+            data = os.read(fd, 65536)
+            if not data: break
+            total += len(data)
+            d = decoder.decode(data, final=False)
+            if d: yield d
+            if total > TERM_MAX_OUTPUT:
+                kill_group(p); killed = True
+                yield f"\n...[output truncated at {TERM_MAX_OUTPUT >> 20}MB]"
+                break
+        p.stdout.close()
+        # EOF is not exit: a command that closed or redirected its output still owes the deadline
+        if not killed:
+            try: p.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                kill_group(p)
+                yield timed_out
+    except GeneratorExit:
+        # Reader went away (closed tab / dropped stream): don't leave the command running
+        kill_group(p)
+        p.stdout.close(); p.wait()
+        raise
+    yield p.wait()
+
+@editor_bp.route('/editor/api/term_stream', methods=['POST'])
+def term_stream():
+    d = json_body()
+    cwd = get_cwd_context(d['project'], d.get('path'))
+    def events():
+        try:
+            for item in stream_command(d['cmd'], cwd):
+                if isinstance(item, int): yield f"event: done\ndata: {item}\n\n"
+                else: yield f"data: {json.dumps(item)}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps(f'Execution Error: {str(e)}')}\n\nevent: done\ndata: -1\n\n"
+    return current_app.response_class(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+# --- INTERACTIVE TERMINAL (SOCKET.IO) ---
+def set_winsize(fd, data):
+    """Applies the client's xterm size ({'cols', 'rows'}) to a pty; ignored when missing or bogus."""
+    try: rows, cols = int(data.get('rows', 0)), int(data.get('cols', 0))
+    except (TypeError, ValueError): return
+    if 0 < rows < 1000 and 0 < cols < 1000:
+        try: fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack('HHHH', rows, cols, 0, 0))
+        except OSError: pass
+
+# One long-lived bash on a pty per browser session: { sid: (process, master_fd) }
+term_sessions = {}
+
+class TerminalNamespace(Namespace):
+    """Streams keystrokes into a per-client pty and its output back over the socket."""
+
+    def on_connect(self, *args):
+        # The server allows any CORS origin; a shell must only be reachable from our own pages.
+        # Hosts only: a TLS-terminating proxy changes the scheme, a rewriting one the Host header
+        origin = request.headers.get('Origin')
+        if not origin: return
+        host = (request.headers.get('X-Forwarded-Host') or request.host).split(',')[0].strip()
+        if urllib.parse.urlsplit(origin).netloc.lower() != host.lower(): return False
+
+    def on_start(self, data):
+        sid = request.sid
+        if sid in term_sessions: return
+        root, _ = get_config_safe(data.get('project'))
+
+        master, slave = pty.openpty()
+        set_winsize(master, data)  # before bash starts, so readline sees the real width from the first prompt
+        p = subprocess.Popen(['/bin/bash', '-i'], cwd=root or os.getcwd(), stdin=slave, stdout=slave, stderr=slave, preexec_fn=os.setsid, env=PTY_ENV)
+        os.close(slave)
+        term_sessions[sid] = (p, master)
+        self.socketio.start_background_task(self._pump, sid, master)
+
+    def on_input(self, data):
+        session = term_sessions.get(request.sid)
+        if not session: return
+        try: os.write(session[1], data.get('data', '').encode())
+        except OSError: pass
+
+    def on_resize(self, data):
+        # The kernel SIGWINCHes the pty's foreground job (readline, less, vim, top) on change
+        session = term_sessions.get(request.sid)
+        if session: set_winsize(session[1], data)
+
+    def on_disconnect(self, *args):
+        # Hang up the shell like a closed terminal would; _pump reaps it
+        session = term_sessions.get(request.sid)
+        if not session: return
+        try: os.killpg(os.getpgid(session[0].pid), signal.SIGHUP)
+        except: pass
+
+    def on_run(self, data):
+        # One-shot command for the Git panel: output is streamed, not buffered
+        cwd = get_cwd_context(data.get('project'), data.get('path'))
+        self.socketio.start_background_task(self._run, request.sid, data.get('id'), data.get('cmd', ''), cwd)
+
+    def _run(self, sid, run_id, cmd, cwd):
+        def emit(event, payload):
+            payload['id'] = run_id
+            self.socketio.emit(event, payload, to=sid, namespace=self.namespace)
+        try:
+            for item in stream_command(cmd, cwd):
+                if isinstance(item, int): emit('run_done', {'code': item})
+                else: emit('run_output', {'data': item})
+        except Exception as e:
+            emit('run_output', {'data': f"Execution Error: {str(e)}"})
+            emit('run_done', {'code': -1})
+
+    def _pump(self, sid, master):
+        # Same incremental-decoder loop as the build console, one emit per read
+        decoder = codecs.getincrementaldecoder("utf-8")(errors='replace')
+        while True:
+            try:
+                data = os.read(master, 65536)
+                if not data: break
+            except OSError:
+                break  # pty closed (shell exited or client disconnected)
+            d = decoder.decode(data, final=False)
+            if d: self.socketio.emit('output', {'data': d}, to=sid, namespace=self.namespace)
+        p, _ = term_sessions.pop(sid)
+        p.wait()
+        os.close(master)
 
 # --- GIT IDENTITY ENDPOINT ---
 @editor_bp.route('/editor/api/git/identity')
@@ -917,60 +1661,69 @@ def git_identity():
     # Use 'git config' to read values
     name = subprocess.run('git config user.name', shell=True, cwd=cwd, stdout=subprocess.PIPE).stdout.decode().strip()
     email = subprocess.run('git config user.email', shell=True, cwd=cwd, stdout=subprocess.PIPE).stdout.decode().strip()
-    return jsonify({'name': name, 'email': email})
+    return ojson({'name': name, 'email': email})
+
+# --- GIT SETUP ENDPOINT ---
+@editor_bp.route('/editor/api/git/setup', methods=['POST'])
+def git_setup():
+    d = json_body()
+    cwd = get_cwd_context(d.get('project'), d.get('path'))
+    # All three config writes in one shell, so the dialog costs one request and one fork
+    cmd = (f"git config --global user.name {shlex.quote(d.get('name') or '')}"
+           f" && git config --global user.email {shlex.quote(d.get('email') or '')}"
+           " && git config --global --add safe.directory '*'")
+    res = subprocess.run(cmd, shell=True, cwd=cwd, env=BASE_ENV, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    out = res.stdout.decode('utf-8', errors='replace')
+    if res.returncode != 0: return ojson({'error': out or f"git config exited with {res.returncode}"})
+    return ojson({'output': out if out.strip() else "Git identity configured."})
 
 # --- APPLY PATCH FILE ENDPOINT ---
 @editor_bp.route('/editor/api/git/apply_patch', methods=['POST'])
 def apply_patch():
     try:
-        if 'patch' not in request.files: return jsonify({'error': 'No file part'})
+        if 'patch' not in request.files: return ojson({'error': 'No file part'})
         f = request.files['patch']
-        if f.filename == '': return jsonify({'error': 'No selected file'})
+        if f.filename == '': return ojson({'error': 'No selected file'})
         
         cwd = get_cwd_context(request.form.get('project'), request.form.get('path'))
-        patch_path = os.path.join(cwd, f.filename)
-        
-        # Save temp file
-        f.save(patch_path)
-        
-        # Apply
-        res = subprocess.run(f'git apply "{f.filename}"', shell=True, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        
-        # Cleanup
-        if os.path.exists(patch_path):
-            os.remove(patch_path)
-        
+
+        # Apply (patch is fed on stdin, so no temp file to write or clean up)
+        res = subprocess.run(['git', 'apply', '-'], cwd=cwd, input=f.read(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
         out = res.stdout.decode('utf-8', errors='replace')
         
         if res.returncode != 0:
-            return jsonify({'error': out})
+            return ojson({'error': out})
             
-        return jsonify({'output': out if out.strip() else "Patch applied successfully."})
+        return ojson({'output': out if out.strip() else "Patch applied successfully."})
         
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return ojson({'error': str(e)})
 
 @editor_bp.route('/editor/api/create', methods=['POST'])
 def create_item():
-    d = request.json
+    d = json_body()
     project = d.get('project')
     rel_path = d.get('path')
     item_type = d.get('type')
     
     root, _ = get_config_safe(project)
-    if not root: return jsonify({'error': 'Project not found'})
+    if not root: return ojson({'error': 'Project not found'})
     
-    abs_path = os.path.abspath(os.path.join(root, rel_path))
-    if not abs_path.startswith(root):
-        return jsonify({'error': 'Invalid path security'})
+    try: abs_path = safe_join(root, rel_path)
+    except PermissionError: return ojson({'error': 'Invalid path security'})
 
     try:
         if item_type == 'dir':
             os.makedirs(abs_path, exist_ok=True)
         else:
-            if not os.path.exists(abs_path):
-                with open(abs_path, 'w') as f: pass 
+            # 'x' creates only if missing: one open() instead of exists() + open()
+            try:
+                with open(abs_path, 'x') as f: pass
+            except FileExistsError:
+                pass
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return ojson({'error': str(e)})
+    invalidate_tree(abs_path)
         
-    return jsonify({'status': 'ok'})
+    return ojson({'status': 'ok'})
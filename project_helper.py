@@ -0,0 +1,53 @@
+import os
+import subprocess
+
+# Shared by the CLI (q-build-manager.py) and the web dashboard (web_manager.py)
+WORK_DIR = "/work"
+REGISTRY_FILE = os.path.join(WORK_DIR, "projects_registry.yaml")
+META_QCOM_URL = "https://github.com/qualcomm-linux/meta-qcom.git"
+META_QCOM_CACHE = os.path.join(WORK_DIR, ".cache", "meta-qcom.git")  # shallow bare copy shared by all yocto projects
+
+# PyYAML is imported on first use, so the CLI menu comes up (and Exit returns) without loading it
+def load_yaml(f):
+    import yaml
+    # libyaml bindings when available, pure-Python otherwise
+    return yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+def dump_yaml(data, f=None):
+    import yaml
+    return yaml.dump(data, f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper))
+
+def file_stamp(path):
+    """(mtime_ns, size) of a file, or None if it is gone."""
+    try: st = os.stat(path)
+    except OSError: return None
+    return st.st_mtime_ns, st.st_size
+
+REGISTRY_CACHE = {}  # 'stamp'/'text' of the registry as last read or written by this process
+
+def save_registry(reg):
+    """Writes the registry only when its YAML differs from what is on disk."""
+    text = dump_yaml(reg)
+    stamp = file_stamp(REGISTRY_FILE)
+    if stamp is not None and REGISTRY_CACHE.get('stamp') != stamp:
+        # Changed by the other entry point (or first call): reread it once
+        with open(REGISTRY_FILE) as f: REGISTRY_CACHE.update(stamp=stamp, text=f.read())
+    if stamp is not None and REGISTRY_CACHE.get('text') == text: return
+    with open(REGISTRY_FILE, "w") as f: f.write(text)
+    REGISTRY_CACHE.update(stamp=file_stamp(REGISTRY_FILE), text=text)
+
+def clone_meta_qcom(dst):
+    """Shallow-clones meta-qcom into dst from a local depth-1 copy of its default branch, refreshed per clone."""
+    if os.path.isdir(META_QCOM_CACHE):
+        subprocess.run(["git", "-C", META_QCOM_CACHE, "fetch", "--depth", "1", "--prune", "--quiet"])
+    elif subprocess.run(["git", "clone", "--bare", "--depth", "1", "--quiet", META_QCOM_URL, META_QCOM_CACHE]).returncode == 0:
+        # A bare clone has no fetch refspec: track just the default branch so refreshes stay depth 1
+        head = subprocess.run(["git", "-C", META_QCOM_CACHE, "symbolic-ref", "HEAD"], stdout=subprocess.PIPE, text=True).stdout.strip()
+        subprocess.run(["git", "-C", META_QCOM_CACHE, "config", "remote.origin.fetch", f"+{head}:{head}"])
+    if os.path.isdir(META_QCOM_CACHE):
+        res = subprocess.run(["git", "clone", "--depth", "1", "file://" + META_QCOM_CACHE, dst])
+        if res.returncode == 0:
+            subprocess.run(["git", "-C", dst, "remote", "set-url", "origin", META_QCOM_URL])
+            return res
+    # No usable local copy (e.g. first clone failed): clone from GitHub directly
+    return subprocess.run(["git", "clone", "--depth", "1", META_QCOM_URL, dst])
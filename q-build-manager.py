@@ -2,22 +2,25 @@
 import os
 import sys
 import subprocess
-import glob
-import yaml
-import shutil
 
-WORK_DIR = "/work"
-REGISTRY_FILE = os.path.join(WORK_DIR, "projects_registry.yaml")
+from project_helper import WORK_DIR, REGISTRY_FILE, load_yaml, dump_yaml, save_registry, clone_meta_qcom
 
 def run_cmd(cmd, cwd=None):
     subprocess.run(cmd, shell=True, check=True, cwd=cwd, executable='/bin/bash')
 
+def whiptail(*args):
+    # whiptail draws on the terminal and prints the answer on stderr; Cancel/Esc exit non-zero
+    result = subprocess.run(["whiptail", *args], stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0: return None
+    return result.stderr.strip()
+
 def menu(title, options):
-    args = ["whiptail", "--title", title, "--menu", "Select Option", "20", "70", "10"]
+    # Nothing to choose between: skip the dialog (and its fork/exec)
+    if len(options) == 1: return next(iter(options))
+    args = ["--title", title, "--menu", "Select Option", "20", "70", "10"]
     for k, v in options.items():
         args.extend([k, v])
-    result = subprocess.run(args, stderr=subprocess.PIPE, text=True)
-    return result.stderr.strip()
+    return whiptail(*args)
 
 def main():
     while True:
@@ -31,17 +34,20 @@ def main():
             sys.exit(0)
             
         if choice == "1":
-            name = subprocess.check_output(["whiptail", "--inputbox", "Project Name:", "10", "60"], stderr=subprocess.STDOUT).decode().strip()
+            name = whiptail("--inputbox", "Project Name:", "10", "60")
+            if not name: continue
             path = os.path.join(WORK_DIR, "meta-qcom-builds", name)
             os.makedirs(path, exist_ok=True)
             
             print("Cloning meta-qcom...")
-            subprocess.run(["git", "clone", "https://github.com/qualcomm-linux/meta-qcom.git", os.path.join(path, "meta-qcom")])
+            clone_meta_qcom(os.path.join(path, "meta-qcom"))
             
             # Board Scan
-            boards = glob.glob(os.path.join(path, "meta-qcom/ci/*.yml"))
-            board_map = {str(i): os.path.basename(b).replace(".yml", "") for i, b in enumerate(boards)}
+            with os.scandir(os.path.join(path, "meta-qcom", "ci")) as it:
+                boards = sorted(e.name[:-4] for e in it if e.name.endswith(".yml") and e.is_file(follow_symlinks=False))
+            board_map = {str(i): b for i, b in enumerate(boards)}
             b_choice = menu("Select Board", board_map)
+            if not b_choice: continue
             board = board_map[b_choice]
             
             # Config
@@ -50,28 +56,29 @@ def main():
             kas_string = f"{board_file}:{distro_file}"
             
             cfg = {"board": board, "kas_files": kas_string, "image": "qcom-multimedia-image"}
-            with open(os.path.join(path, "config.yaml"), "w") as f: yaml.dump(cfg, f)
+            with open(os.path.join(path, "config.yaml"), "w") as f: dump_yaml(cfg, f)
             
             # Register
             if os.path.exists(REGISTRY_FILE):
-                with open(REGISTRY_FILE) as f: reg = yaml.safe_load(f) or {}
+                with open(REGISTRY_FILE) as f: reg = load_yaml(f) or {}
             else: reg = {}
             reg[name] = path
-            with open(REGISTRY_FILE, "w") as f: yaml.dump(reg, f)
+            save_registry(reg)
             
         elif choice == "2":
             if not os.path.exists(REGISTRY_FILE): continue
-            with open(REGISTRY_FILE) as f: reg = yaml.safe_load(f)
+            with open(REGISTRY_FILE) as f: reg = load_yaml(f)
             
             p_map = {str(i): k for i, k in enumerate(reg.keys())}
             p_choice = menu("Select Project", p_map)
+            if not p_choice: continue
             name = p_map[p_choice]
             path = reg[name]
             
-            with open(os.path.join(path, "config.yaml")) as f: cfg = yaml.safe_load(f)
+            with open(os.path.join(path, "config.yaml")) as f: cfg = load_yaml(f)
             
-            cmd = f"kas shell {cfg['kas_files']} -c 'bitbake {cfg['image']}'"
-            os.system(f"cd {path} && {cmd}")
+            # argv + cwd: no intermediate shell, and paths with spaces stay intact
+            subprocess.run(["kas", "shell", cfg['kas_files'], "-c", f"bitbake {cfg['image']}"], cwd=path)
 
 if __name__ == "__main__":
     main()
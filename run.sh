@@ -56,6 +56,7 @@ while true; do
             docker run -it --rm \
                 -v $(pwd)/work:/work \
                 -v $(pwd)/$TUI_SCRIPT:/work/$TUI_SCRIPT \
+                -v $(pwd)/project_helper.py:/work/project_helper.py \
                 -e HOST_UID=$(id -u) \
                 -e HOST_GID=$(id -g) \
                 -e QGENIE_API_KEY="$QGENIE_API_KEY" \
@@ -85,6 +86,7 @@ while true; do
                 -v $(pwd)/$WEB_SCRIPT:/work/$WEB_SCRIPT \
                 -v $(pwd)/editor_manager.py:/work/editor_manager.py \
                 -v $(pwd)/ai_helper.py:/work/ai_helper.py \
+                -v $(pwd)/project_helper.py:/work/project_helper.py \
                 -v $(pwd)/visualization:/work/visualization \
                 -e HOST_UID=$(id -u) \
                 -e HOST_GID=$(id -g) \
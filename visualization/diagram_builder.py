@@ -1,31 +1,49 @@
 import re
+import functools
 import hashlib
+import itertools
+
+# Labels end at the first quote or phandle/cell bracket
+LABEL_CUT_RE = re.compile(r'["<]')
+
+# Parent group keywords for build_graph_json, checked in this order
+SPEAKER_RE    = re.compile(r'spkr|speaker')
+PERIPHERAL_RE = re.compile(r'wcd|wsa|codec|amp|max98357')
+BUS_RE        = re.compile(r'soundwire|pcm|tdm|dmic')
+SWR_RE        = re.compile(r'\bswr(\d+)\b')
+
+# Nodes left out of the hardware views
+LOW_LEVEL_LABEL_RE = re.compile(r'#include|dt-bindings', re.IGNORECASE)
+LOW_LEVEL_ID_RE    = re.compile(r'pinctrl|gpio', re.IGNORECASE)
+
+# Mermaid (classDef, open, close) per hardware node type
+NODE_STYLES   = {'sndcard': ('snd', '([', '])'), 'soc': ('soc', '[', ']'), 'codec': ('codec', '([', '])')}
+GENERIC_STYLE = ('gen', '[', ']')
 
 class DiagramBuilder:
     def __init__(self, parser):
         print("[V26] High-Level Block Engine Loaded")
         self.parser = parser
+        self._id_cache = {}  # raw_id -> safe id; the same ids are hashed once per node/edge otherwise
 
     def _get_safe_id(self, raw_id):
         if not raw_id:
             return "node_unknown"
-        return "node_" + hashlib.md5(raw_id.encode()).hexdigest()[:8]
+        sid = self._id_cache.get(raw_id)
+        if sid is None:
+            sid = self._id_cache[raw_id] = "node_" + hashlib.blake2b(raw_id.encode(), digest_size=4).hexdigest()
+        return sid
 
     def _is_high_level_node(self, node):
-        label = node.get('label', '').lower()
-        nid   = node.get('id', '').lower()
-        if '#include' in label or 'dt-bindings' in label:
-            return False
-        if 'pinctrl' in nid or 'gpio' in nid:
-            return False
-        return True
-
-    def sanitize_label(self, text):
+        # Case-insensitive searches: no lowered copies of label/id
+        return not (LOW_LEVEL_LABEL_RE.search(node.get('label', '')) or LOW_LEVEL_ID_RE.search(node.get('id', '')))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def sanitize_label(text):
         if not text:
             return 'Block'
-        clean = text.split('"')[0]
-        clean = clean.split('<')[0]
-        clean = clean.replace('_', ' ').title()
+        clean = LABEL_CUT_RE.split(text, 1)[0].replace('_', ' ').title()
         if len(clean) > 25:
             clean = clean[:22] + '...'
         return clean
@@ -37,81 +55,84 @@ class DiagramBuilder:
             'routing':  self.build_routing_diagram()
         }
 
-    # Mermaid helpers (unchanged)
+    # Mermaid helpers: each diagram is a line generator, so callers writing to a file or
+    # response can stream it; build_* join it into the string the web UI expects
     def build_hardware_diagram(self):
-        lines = ["graph TD"]
-        lines.append("classDef snd fill:#ff9900,stroke:#333,stroke-width:2px,color:white,rx:5,ry:5")
-        lines.append("classDef soc fill:#2962ff,stroke:#333,stroke-width:0px,color:white,rx:2,ry:2")
-        lines.append("classDef codec fill:#00c853,stroke:#333,stroke-width:0px,color:white,rx:5,ry:5")
-        lines.append("classDef gen fill:#607d8b,stroke:#333,color:white")
+        return "\n".join(self.hardware_lines())
+
+    def build_dailinks_diagram(self):
+        return "\n".join(self.dailinks_lines())
+
+    def build_routing_diagram(self):
+        return "\n".join(self.routing_lines())
+
+    def hardware_lines(self):
+        yield "graph TD"
+        yield "classDef snd fill:#ff9900,stroke:#333,stroke-width:2px,color:white,rx:5,ry:5"
+        yield "classDef soc fill:#2962ff,stroke:#333,stroke-width:0px,color:white,rx:2,ry:2"
+        yield "classDef codec fill:#00c853,stroke:#333,stroke-width:0px,color:white,rx:5,ry:5"
+        yield "classDef gen fill:#607d8b,stroke:#333,color:white"
         nodes = self.parser.get_hardware_nodes()
         conns = self.parser.get_hardware_connections()
-        valid_ids = set()
-        for n in nodes:
-            if not self._is_high_level_node(n):
-                continue
+        # Filter and hash in two comprehensions up front; the emit loop below only looks ids up
+        drawn  = [n for n in nodes if self._is_high_level_node(n)]
+        id_map = {n['id']: self._get_safe_id(n['id']) for n in drawn}  # edges resolve through it too
+        for n in drawn:
             raw_id  = n['id']
-            safe_id = self._get_safe_id(raw_id)
-            valid_ids.add(raw_id)
+            safe_id = id_map[raw_id]
             label = self.sanitize_label(n['label'])
-            ntype = n.get('type', 'generic')
-            css   = 'gen'
-            o,c   = '[',']'
-            if ntype == 'sndcard': css='snd'; o,c='([','])'
-            elif ntype == 'soc':   css='soc'
-            elif ntype == 'codec': css='codec'; o,c='([','])'
-            lines.append(f"{safe_id}{o}\"{label}\"{c}:::{css}")
-            lines.append(f"click {safe_id} callNodeCallback \"{raw_id}\"")
+            css, o, c = NODE_STYLES.get(n.get('type', 'generic'), GENERIC_STYLE)
+            yield f"{safe_id}{o}\"{label}\"{c}:::{css}"
+            yield f"click {safe_id} callNodeCallback \"{raw_id}\""
         for src,dst,lbl in conns:
-            if src in valid_ids and dst in valid_ids:
-                s = self._get_safe_id(src); d = self._get_safe_id(dst)
+            s = id_map.get(src); d = id_map.get(dst)
+            if s and d and s != d:
                 l = self.sanitize_label(lbl) or 'link'
-                if s != d:
-                    lines.append(f"{s} -- \"{l}\" --> {d}")
-        return "\n".join(lines)
+                yield f"{s} -- \"{l}\" --> {d}"
 
-    def build_dailinks_diagram(self):
-        lines=["graph LR","classDef cpu fill:#2962ff,color:white","classDef codec fill:#00c853,color:white"]
+    def dailinks_lines(self):
+        yield from ("graph LR", "classDef cpu fill:#2962ff,color:white", "classDef codec fill:#00c853,color:white")
         for link in self.parser.dailinks:
             name   = self.sanitize_label(link['name'])
-            cpus   = [c for c in link['cpu']]
-            codecs = [c for c in link['codec']]
-            for c in cpus:
-                sid = self._get_safe_id(c); lines.append(f'{sid}["{c}"]:::cpu')
-            for c in codecs:
-                sid = self._get_safe_id(c); lines.append(f'{sid}["{c}"]:::codec')
-            for cpu in cpus:
-                for codec in codecs:
-                    s = self._get_safe_id(cpu); d = self._get_safe_id(codec)
-                    lines.append(f'{s} -- "{name}" --> {d}')
-        return "\n".join(lines)
-
-    def build_routing_diagram(self):
-        lines=["graph LR"]
-        for src,dst in self.parser.routing:
-            s=self._get_safe_id(src); d=self._get_safe_id(dst)
-            lines.append(f"{s} --> {d}")
-        return "\n".join(lines)
+            cpus   = link['cpu']
+            codecs = link['codec']
+            cpu_sids   = list(map(self._get_safe_id, cpus))
+            codec_sids = list(map(self._get_safe_id, codecs))
+            yield from (f'{sid}["{c}"]:::cpu' for sid, c in zip(cpu_sids, cpus))
+            yield from (f'{sid}["{c}"]:::codec' for sid, c in zip(codec_sids, codecs))
+            yield from (f'{s} -- "{name}" --> {d}' for s, d in itertools.product(cpu_sids, codec_sids))
+
+    def routing_lines(self):
+        safe = self._get_safe_id
+        yield "graph LR"
+        yield from (f"{safe(s)} --> {safe(d)}" for s,d in self.parser.routing)
 
     # Cytoscape JSON (dynamic SWR + PCM fallback)
     def build_graph_json(self):
-        import re
+        # Parser sources and hot methods bound once for the whole build
+        p = self.parser
+        hw_nodes = p.get_hardware_nodes() if hasattr(p, 'get_hardware_nodes') else []
+        dailinks = getattr(p, 'dailinks', None) or []
+        safe, sanitize, high_level = self._get_safe_id, self.sanitize_label, self._is_high_level_node
 
         def add_node(node_map, raw_id, label=None, ntype='component', full_name=None, parent=None):
             if not raw_id:
                 return None
-            sid = self._get_safe_id(raw_id)
+            sid = safe(raw_id)
             if sid not in node_map:
-                lab = label if label is not None else (raw_id or '')
-                lab = self.sanitize_label(lab)
+                # sanitize_label already cuts at the first '"', so no quote survives into lab
+                lab = sanitize(label if label is not None else raw_id)
                 node_map[sid] = {
                     'id': sid,
-                    'label': (lab or '').replace('"',''),
+                    'label': lab or '',
                     'type': ntype or 'component',
                     'full_name': full_name or raw_id
                 }
             if parent is not None:
                 node_map[sid]['parent'] = parent
+                unparented.discard(sid)
+            elif 'parent' not in node_map[sid]:
+                unparented.add(sid)
             return sid
 
         def classify_parent_for(sid):
@@ -119,10 +140,11 @@ class DiagramBuilder:
             if not n: return 'grp_lpass'
             if n.get('type') == 'group':
                 return None  # groups must stay top-level
-            lbl = (n.get('label') or '').lower(); fn = (n.get('full_name') or '').lower(); t = n.get('type')
-            if any(x in lbl for x in ['spkr','speaker']) or any(x in fn for x in ['spkr','speaker']): return 'grp_speakers'
-            if t in ('codec','amp') or any(x in lbl for x in ['wcd','wsa','codec','amp','max98357']) or any(x in fn for x in ['wcd','wsa','codec','amp','max98357']): return 'grp_peripherals'
-            if t == 'bus' or any(x in lbl for x in ['soundwire','pcm','tdm','dmic']): return 'grp_buses'
+            lbl = (n.get('label') or '').lower(); t = n.get('type')
+            both = lbl + '\n' + (n.get('full_name') or '').lower()  # keywords never contain '\n'
+            if SPEAKER_RE.search(both): return 'grp_speakers'
+            if t in ('codec','amp') or PERIPHERAL_RE.search(both): return 'grp_peripherals'
+            if t == 'bus' or BUS_RE.search(lbl): return 'grp_buses'
             if t == 'sndcard': return 'grp_host'
             return 'grp_lpass'
 
@@ -133,45 +155,44 @@ class DiagramBuilder:
                 return  # never parent groups inside other groups
             if 'parent' not in n or n['parent'] is None:
                 node_map[sid]['parent'] = classify_parent_for(sid)
+            unparented.discard(sid)
+
+        def push_edge(kind, s, d, label):
+            # Links sharing an SPF/macro/master path would otherwise repeat the same edge
+            key = (kind, s, d, label)
+            if key in seen_edges: return
+            seen_edges.add(key)
+            edges.append({'source': s, 'target': d, 'kind': kind, 'label': label})
 
         def add_edge(kind, src_raw, dst_raw, label=''):
             s = add_node(node_map, src_raw); d = add_node(node_map, dst_raw)
             if not s or not d: return
             ensure_parent(s); ensure_parent(d)
-            edges.append({'source': s, 'target': d, 'kind': kind, 'label': (label or '').replace('"','')})
+            push_edge(kind, s, d, (label or '').replace('"',''))
 
-        def is_macro(tok):
-            tl = (tok or '').lower()
+        # Token helpers take the token lowercased once by the caller (tl)
+        def is_macro(tl):
             return tl.startswith('lpass_') and ('macro' in tl)
 
-        def macro_name(tok):
-            tl = (tok or '').lower()
+        def macro_name(tl):
             if 'rxmacro' in tl: return 'rxmacro','Lpaif Rx'
             if 'txmacro' in tl: return 'txmacro','Lpaif Tx'
             if 'wsamacro' in tl: return 'wsamacro','Wsa Macro'
             if 'vamacro' in tl: return 'vamacro','Va Macro'
             return 'macro','Macro'
 
-        def is_platform(tok):
-            tl = (tok or '').lower(); return tl.startswith('q6apm') or tl == 'q6apm'
-
-        def is_swr(tok):
-            return re.search(r'\bswr(\d+)\b', (tok or '').lower()) is not None
+        def is_platform(tl):
+            return tl.startswith('q6apm')
 
-        def swr_index(tok):
-            m = re.search(r'\bswr(\d+)\b', (tok or '').lower()); return int(m.group(1)) if m else None
-
-        def endpoint_label(tok):
-            tl = (tok or '').lower()
+        def endpoint_label(tok, tl):
             if 'left_spkr' in tl:  return 'Left Spk'
             if 'right_spkr' in tl: return 'Right Spk'
             if 'wcd' in tl:        return tok.upper()
             if 'wsa' in tl:        return tok.upper()
             if 'max98357' in tl:   return 'MAX98357A'
-            return self.sanitize_label(tok)
+            return sanitize(tok)
 
-        def endpoint_type(tok):
-            tl = (tok or '').lower()
+        def endpoint_type(tl):
             if 'spkr' in tl: return 'speaker'
             if 'wsa' in tl or 'max98357' in tl: return 'amp'  # treat MAX98357A as amp (I2S/TDM)
             return 'codec'
@@ -185,6 +206,8 @@ class DiagramBuilder:
             'grp_speakers':   {'id':'grp_speakers','label':'Speakers','type':'group','full_name':'Speakers'},
         }
         edges = []
+        unparented = set()  # sids added without a parent and not yet placed
+        seen_edges = set()  # (kind, source, target, label) already in edges
 
         # Anchors
         add_node(node_map, 'host.app',  'App Framework',       'component', 'App Framework (AudioFlinger/ALSA)', 'grp_host')
@@ -199,19 +222,19 @@ class DiagramBuilder:
         add_edge('hardware', 'host.ddr', 'lpass.spf')
 
         # Base hardware nodes — do NOT force parents here (except sndcard)
-        for n in (getattr(self.parser,'get_hardware_nodes',lambda:[])() or []):
+        for n in (hw_nodes or []):
             try:
-                if hasattr(self,'_is_high_level_node') and not self._is_high_level_node(n):
+                if not high_level(n):
                     continue
             except Exception:
                 pass
             sid = add_node(node_map, n.get('id',''), n.get('label',''), n.get('type','component'), n.get('full_name',''))
             if sid and n.get('type') == 'sndcard':
-                node_map[sid]['parent'] = 'grp_host'
+                node_map[sid]['parent'] = 'grp_host'; unparented.discard(sid)
                 add_edge('hardware', n.get('id',''), 'host.kdrv')
 
         # DAI links -> dynamic wiring
-        for link in (getattr(self.parser,'dailinks',[]) or []):
+        for link in dailinks:
             name   = (link.get('name') or '').replace('"','')
             cpus   = link.get('cpu',   []) or []
             codecs = link.get('codec', []) or []
@@ -221,30 +244,32 @@ class DiagramBuilder:
 
             macros   = []   # (macro_id, label)
             masters  = {}   # swr_index -> 'bus.swrN'
-            endpoints= []   # real DTS tokens in this link
+            endpoints= []   # (token, lowercased token) of the real DTS endpoints in this link
 
             for tok in codecs:
                 if not tok: continue
-                if is_platform(tok):
+                tl = tok.lower()
+                if is_platform(tl):
                     continue
-                if is_macro(tok):
-                    mkey,mlab = macro_name(tok)
+                if is_macro(tl):
+                    mkey,mlab = macro_name(tl)
                     mid = f'lpass.{mkey}'
                     macros.append((mid, mlab))
                     add_node(node_map, mid, mlab, 'soc', f'LPASS {mlab}', 'grp_lpass')
                     continue
-                if is_swr(tok):
-                    idx = swr_index(tok)
-                    if idx is not None and idx not in masters:
+                m = SWR_RE.search(tl)
+                if m:
+                    idx = int(m.group(1))
+                    if idx not in masters:
                         bid = f'bus.swr{idx}'
                         add_node(node_map, bid, f'SWR{idx} Master', 'bus', f'SoundWire SWR{idx} Master', 'grp_buses')
                         masters[idx] = bid
                     continue
                 # endpoints -> enforce Peripherals/Speakers, never LPASS
-                typ    = endpoint_type(tok)
+                typ    = endpoint_type(tl)
                 parent = 'grp_speakers' if typ == 'speaker' else 'grp_peripherals'
-                add_node(node_map, tok, endpoint_label(tok), typ, tok, parent)
-                endpoints.append(tok)
+                add_node(node_map, tok, endpoint_label(tok, tl), typ, tok, parent)
+                endpoints.append((tok, tl))
 
             # SPF to Macros or to Masters directly
             if macros:
@@ -259,30 +284,30 @@ class DiagramBuilder:
 
             # Wire masters or fall back to PCM/TDM
             if masters and endpoints:
-                has_speakers = any('spkr' in (e or '').lower() for e in endpoints)
-                has_wsa      = any('wsa'  in (e or '').lower() for e in endpoints)
+                has_speakers = any('spkr' in tl for _,tl in endpoints)
+                has_wsa      = any('wsa'  in tl for _,tl in endpoints)
                 for _,bid in masters.items():
                     if has_speakers and not has_wsa:
                         wsa_auto = 'periph.wsa_auto'
                         add_node(node_map, wsa_auto, 'Wsa Amplifier', 'amp', 'WSA Amplifier', 'grp_peripherals')
                         add_edge('hardware', bid, wsa_auto)
-                        for ep in endpoints:
-                            if 'spkr' in ep.lower():
+                        for ep,tl in endpoints:
+                            if 'spkr' in tl:
                                 add_edge('hardware', wsa_auto, ep)
-                    for ep in endpoints:
-                        if has_speakers and not has_wsa and 'spkr' in ep.lower():
+                    for ep,tl in endpoints:
+                        if has_speakers and not has_wsa and 'spkr' in tl:
                             continue
                         add_edge('hardware', bid, ep)
 
             elif macros and endpoints:
                 for mid,_ in macros:
-                    for ep in endpoints:
+                    for ep,_ in endpoints:
                         add_edge('hardware', mid, ep)
             else:
                 # No SWR masters and no macros: classic PCM/TDM path
                 # Ensure SPF -> PCM/TDM Ports is visible for this link
                 add_edge('hardware', 'lpass.spf', 'bus.pcm')
-                for ep in endpoints:
+                for ep,_ in endpoints:
                     add_edge('hardware', 'bus.pcm', ep)
 
             # VA macro path (non-SoundWire)
@@ -291,20 +316,23 @@ class DiagramBuilder:
                 add_node(node_map, 'periph.dmic', 'DMICs', 'component', 'Digital Microphones', 'grp_peripherals')
                 add_edge('hardware', 'bus.dmic', 'periph.dmic')
 
-            # DAI edges preserved
-            for cpu in cpus:
-                for codec in codecs:
-                    add_edge('dai', cpu, codec, name)
+            # DAI edges preserved: resolve each endpoint once, then emit the CPU x codec batch
+            if cpus:
+                cpu_sids = [add_node(node_map, c) for c in cpus]
+                codec_sids = [add_node(node_map, c) for c in codecs]
+                for sid in cpu_sids + codec_sids: ensure_parent(sid)
+                for s, d in itertools.product(cpu_sids, codec_sids):
+                    if s and d: push_edge('dai', s, d, name)
 
             # If any endpoint looks like a WCD codec, attach a Headset/Earpiece sink
-            if any(('wcd' in (ep or '').lower()) for ep in endpoints):
+            if any('wcd' in tl for _,tl in endpoints):
                 add_node(node_map, 'sink.headset', 'Headphones / Earpiece', 'speaker', 'Headphones / Earpiece', 'grp_speakers')
-                for ep in endpoints:
-                    if 'wcd' in (ep or '').lower():
+                for ep,tl in endpoints:
+                    if 'wcd' in tl:
                         add_edge('hardware', ep, 'sink.headset')
 
-        # Assign parents where missing (skip group nodes)
-        for sid in list(node_map.keys()):
+        # Assign parents where missing: only nodes never given one (groups are never in the set)
+        for sid in list(unparented):
             ensure_parent(sid)
 
         # Optional: DMICs if hinted anywhere
@@ -1,8 +1,21 @@
 
 import re
 import os
+import stat
+
+# Compiled once per process instead of looked up in re's cache on every call
+INCLUDE_RE       = re.compile(r'#include\s+["<]([^">]+)[">]')  # both "file.dtsi" and <file.dtsi>
+COMMENT_RE       = re.compile(r'/\*.*?\*/|//[^\n]*', re.DOTALL)  # block and line comments in one pass
+TOKEN_RE         = re.compile(r'([\{\};])')
+QUOTED_RE        = re.compile(r'"([^"]+)"')
+PHANDLE_RE       = re.compile(r'&([\w_]+)')
+
+UNSET = object()
 
 class DtsNode:
+    # One per device-tree node across the whole include closure: no per-instance __dict__
+    __slots__ = ('name', 'label', 'parent', 'props', 'children')
+
     def __init__(self, name, label=None, parent=None):
         self.name = name
         self.label = label
@@ -21,30 +34,39 @@ class DtsParser:
         self.includes = set()
         self.routing = []
         self.dailinks = []
+        self._resolved = {}  # include name -> resolved path (or None)
+        self._snd = UNSET   # sound card node, found once per parse
+        self._flat = UNSET  # every node in breadth-first order, walked once per parse
+        self._hw = UNSET    # get_hardware_nodes() result, classified once per parse
 
     def parse(self, filename):
         self._parse_recursive(filename, self.root)
+        self._snd = self._flat = self._hw = UNSET  # tree changed; the next lookups walk it again
         self._post_process_routing()
         self._post_process_dailinks()
         return self
 
+    def _resolve_include(self, clean_name):
+        """First candidate that is a regular file, or None; one stat per candidate, memoized per parser."""
+        if clean_name in self._resolved: return self._resolved[clean_name]
+        path = None
+        for c in (os.path.join(self.base_path, clean_name),
+                  os.path.join(self.base_path, "qcom", clean_name), # Common subdir
+                  clean_name): # Absolute or already resolved
+            try:
+                if stat.S_ISREG(os.stat(c).st_mode):
+                    path = c
+                    break
+            except OSError:
+                continue
+        self._resolved[clean_name] = path
+        return path
+
     def _parse_recursive(self, filename, current_root):
         # FIX: Handle both absolute/relative and angle-bracket paths
         clean_name = filename.strip('<>"')
         
-        # 1. Try direct path
-        candidates = [
-            os.path.join(self.base_path, clean_name),
-            os.path.join(self.base_path, "qcom", clean_name), # Common subdir
-            clean_name # Absolute or already resolved
-        ]
-        
-        path = None
-        for c in candidates:
-            if os.path.exists(c) and os.path.isfile(c):
-                path = c
-                break
-        
+        path = self._resolve_include(clean_name)
         if not path or path in self.includes: 
             return
 
@@ -55,18 +77,19 @@ class DtsParser:
         except: return
 
         # FIX: Regex matches both "file.dtsi" and <file.dtsi>
-        includes = re.findall(r'#include\s+["<]([^">]+)[">]', content)
+        includes = INCLUDE_RE.findall(content)
         for inc in includes: 
             # Recursively parse includes
             self._parse_recursive(inc, current_root)
 
-        # Cleanup comments
-        content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-        content = re.sub(r'//.*', '', content)
+        # Cleanup comments (single scan; the delimiter split below stays one C-level pass too)
+        content = COMMENT_RE.sub('', content)
         
         # Parse Nodes
-        tokens = re.split(r'([\{\};])', content)
+        tokens = TOKEN_RE.split(content)
         stack = [current_root]
+        # split() with a capture group strictly alternates text, delimiter, text, ... and every
+        # delimiter consumes the text before it, so buffer is just the last text token
         buffer = ""
 
         for token in tokens:
@@ -85,23 +108,21 @@ class DtsParser:
                     node = DtsNode(name, label, stack[-1]); stack[-1].children.append(node)
                 
                 if label: self.labels[label] = node
-                stack.append(node); buffer = ""
+                stack.append(node)
             elif token == '}':
                 if len(stack) > 1: stack.pop()
-                buffer = ""
             elif token == ';':
                 stmt = buffer.strip()
                 if stmt and stack:
                     if '=' in stmt: k, v = stmt.split('=', 1); stack[-1].props[k.strip()] = v.strip()
                     else: stack[-1].props[stmt] = True
-                buffer = ""
-            else: buffer += token
+            else: buffer = token
 
     def _post_process_routing(self):
         snd = self.get_sound_card_node()
         if snd and "audio-routing" in snd.props:
             raw = snd.props["audio-routing"]
-            parts = re.findall(r'"([^"]+)"', raw)
+            parts = QUOTED_RE.findall(raw)
             for i in range(0, len(parts)-1, 2): self.routing.append((parts[i], parts[i+1]))
 
     def _post_process_dailinks(self):
@@ -109,25 +130,36 @@ class DtsParser:
         if snd:
             for child in snd.children:
                 if 'dai-link' in child.name or 'link-name' in child.props:
+                    subs = {}  # name -> first child of that name, indexed once for the three lookups
+                    for c in child.children: subs.setdefault(c.name, c)
                     self.dailinks.append({
                         "name": child.props.get("link-name", child.name).replace('"', ''),
-                        "cpu": self._extract_phandle(child, "cpu"),
-                        "codec": self._extract_phandle(child, "codec"),
-                        "platform": self._extract_phandle(child, "platform")
+                        "cpu": self._extract_phandle(subs, "cpu"),
+                        "codec": self._extract_phandle(subs, "codec"),
+                        "platform": self._extract_phandle(subs, "platform")
                     })
 
-    def _extract_phandle(self, node, subnode_name):
-        sub = next((c for c in node.children if c.name == subnode_name), None)
+    def _extract_phandle(self, subs, subnode_name):
+        sub = subs.get(subnode_name)
         if not sub: return []
         val = sub.props.get("sound-dai", "")
-        return re.findall(r'&([\w_]+)', val)
+        return PHANDLE_RE.findall(val)
+
+    def all_nodes(self):
+        """Every node in breadth-first order; the tree scans below iterate this list."""
+        if self._flat is UNSET:
+            self._flat = flat = [self.root]
+            for n in flat: flat.extend(n.children)  # appending while iterating = BFS queue
+        return self._flat
 
     def get_sound_card_node(self):
-        queue = [self.root]
+        if self._snd is UNSET: self._snd = self._find_sound_card_node()
+        return self._snd
+
+    def _find_sound_card_node(self):
         # Broad Search for Sound Card
         candidates = []
-        while queue:
-            n = queue.pop(0)
+        for n in self.all_nodes():
             # Check 1: Explicit compatible string
             if "compatible" in n.props:
                 if "sndcard" in n.props["compatible"] or "audio-card" in n.props["compatible"]:
@@ -140,12 +172,15 @@ class DtsParser:
             # Check 3: Name match (weakest)
             if "sound" in n.name and "pinctrl" not in n.name:
                 candidates.append(n)
-                
-            queue.extend(n.children)
         
         return candidates[0] if candidates else None
 
     def get_hardware_nodes(self):
+        # Shared by every diagram of a build; callers only read the dicts
+        if self._hw is UNSET: self._hw = self._classify_hardware_nodes()
+        return self._hw
+
+    def _classify_hardware_nodes(self):
         hw = []
         snd = self.get_sound_card_node()
         
@@ -156,9 +191,7 @@ class DtsParser:
             # Fallback: Scan everything for known audio components even if sound card missing
             pass
 
-        queue = [self.root]
-        while queue:
-            n = queue.pop(0)
+        for n in self.all_nodes():
             comp = n.props.get("compatible", "")
             t = "component"
             
@@ -170,17 +203,17 @@ class DtsParser:
             if t != "component":
                 clean = (n.label or n.name).split('@')[0].upper()
                 hw.append({"id": n.label or f"n_{id(n)}", "label": clean, "type": t, "full_name": n.name})
-            queue.extend(n.children)
         return hw
 
     def get_hardware_connections(self):
-        conns = []
+        """Yield (src, dst, label) edges; the single caller iterates once."""
         snd = self.get_sound_card_node()
-        if not snd: return []
+        if not snd: return
         snd_id = snd.label or f"snd_{id(snd)}"
         for link in self.dailinks:
-            for c in link['cpu']: conns.append((snd_id, c, "CPU: " + link['name']))
-            for c in link['codec']: conns.append((snd_id, c, "Codec: " + link['name']))
-            for cpu in link['cpu']:
-                for codec in link['codec']: conns.append((cpu, codec, "DAI"))
-        return conns
+            cpus, codecs = link['cpu'], link['codec']
+            cpu_lbl, codec_lbl = "CPU: " + link['name'], "Codec: " + link['name']
+            for c in cpus: yield (snd_id, c, cpu_lbl)
+            for c in codecs: yield (snd_id, c, codec_lbl)
+            for cpu in cpus:
+                for codec in codecs: yield (cpu, codec, "DAI")
@@ -1,6 +1,12 @@
 import os
-import glob
 import sys
+import functools
+
+# Never descended into by the deep-search fallback
+PRUNE_DIRS = {'out', '.git', 'sstate-cache', 'node_modules', '.venv'}
+
+# { project_root: dts base } across instances (one per request); found paths only, re-checked with one isdir
+BASE_PATH_CACHE = {}
 
 class PathManager:
     def __init__(self, project_root, mode=None):
@@ -10,7 +16,26 @@ class PathManager:
     def debug(self, msg):
         print(f"[PathManager] {msg}", file=sys.stdout)
 
+    def _subdirs(self, path, match=None):
+        """Paths of the visible subdirectories of path whose name passes match; [] if unreadable."""
+        try:
+            with os.scandir(path) as it:
+                return [e.path for e in it if not e.name.startswith('.') and (match is None or match(e.name)) and e.is_dir()]
+        except OSError:
+            return []
+
     def get_dts_base_path(self):
+        return self.dts_base_path
+
+    @functools.cached_property
+    def dts_base_path(self):
+        hit = BASE_PATH_CACHE.get(self.root)
+        if hit and os.path.isdir(hit): return hit
+        path = self._find_dts_base_path()
+        if path: BASE_PATH_CACHE[self.root] = path
+        return path
+
+    def _find_dts_base_path(self):
         self.debug(f"Searching in {self.root} (Mode: {self.mode})")
 
         # STRATEGY 1: Meta-Qcom Smart Search (Handles tmp-glibc, tmp, etc.)
@@ -24,17 +49,14 @@ class PathManager:
         for start_node in possible_roots:
             if not os.path.exists(start_node): continue
             
-            # Glob for any tmp directory (tmp, tmp-glibc, etc.)
-            tmp_pattern = os.path.join(start_node, "tmp*")
-            tmp_dirs = glob.glob(tmp_pattern)
-            
-            for tmp in tmp_dirs:
-                # Look for work-shared inside tmp
-                ws_pattern = os.path.join(tmp, "work-shared", "*", "kernel-source", "arch", "arm64", "boot", "dts", "qcom")
-                matches = glob.glob(ws_pattern)
-                if matches:
-                    self.debug(f"Found Yocto path: {matches[0]}")
-                    return matches[0]
+            # Any tmp directory (tmp, tmp-glibc, etc.), then any machine under its work-shared;
+            # one scandir per level and the first hit wins
+            for tmp in self._subdirs(start_node, lambda n: n.startswith("tmp")):
+                for ws in self._subdirs(os.path.join(tmp, "work-shared")):
+                    match = os.path.join(ws, "kernel-source", "arch", "arm64", "boot", "dts", "qcom")
+                    if os.path.isdir(match):
+                        self.debug(f"Found Yocto path: {match}")
+                        return match
 
         # STRATEGY 2: Upstream / Standard
         candidates = [
@@ -51,12 +73,11 @@ class PathManager:
         self.debug("Falling back to limited deep walk...")
         for root, dirs, files in os.walk(self.root):
             # Prune massive dirs
-            if 'out' in dirs: dirs.remove('out')
-            if '.git' in dirs: dirs.remove('.git')
-            if 'sstate-cache' in dirs: dirs.remove('sstate-cache')
+            dirs[:] = [d for d in dirs if d not in PRUNE_DIRS]
             
-            # Don't go too deep
+            # Don't go too deep (and don't walk below here either)
             if root.count(os.sep) - self.root.count(os.sep) > 4:
+                dirs[:] = []
                 continue
 
             if "dts" in dirs:
@@ -68,7 +89,11 @@ class PathManager:
         return None
 
     def list_dts_files(self):
-        base = self.get_dts_base_path()
+        return self.dts_files
+
+    @functools.cached_property
+    def dts_files(self):
+        base = self.dts_base_path
         if not base: return []
         try:
             return sorted([f for f in os.listdir(base) if f.endswith('.dts') or f.endswith('.dtsi')])
@@ -1,5 +1,4 @@
 import os
-import yaml
 import glob
 import subprocess
 import pty
@@ -16,13 +15,12 @@ import json
 import ai_helper
 import codecs
 from flask import Flask, render_template_string, request, redirect, abort, jsonify, send_file
-from editor_manager import editor_bp 
+from editor_manager import editor_bp, TerminalNamespace
+from project_helper import WORK_DIR, load_yaml, dump_yaml, file_stamp, save_registry, clone_meta_qcom
 from flask_socketio import SocketIO, emit, join_room
 
 # --- CONFIGURATION ---
 SERVER_PORT = int(os.environ.get("WEB_PORT", 5000))
-WORK_DIR = "/work"
-REGISTRY_FILE = os.path.join(WORK_DIR, "projects_registry.yaml")
 # RESTORED ORIGINAL PATHS
 YOCTO_BASE = os.path.join(WORK_DIR, "meta-qcom-builds")
 UPSTREAM_BASE = os.path.join(WORK_DIR, "upstream-builds")
@@ -40,6 +38,7 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
 app.register_blueprint(editor_bp)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+socketio.on_namespace(TerminalNamespace('/editor/term'))
 
 BUILD_STATES = {}
 
@@ -86,14 +85,12 @@ def sync_registry():
                 created = "Unknown"; modified = "Unknown"
                 
                 # Get Config Data
-                if os.path.exists(cfg_path):
-                    try:
-                        with open(cfg_path) as f: 
-                            c = yaml.safe_load(f)
-                            if c:
-                                if 'type' in c: ptype = c['type']
-                                if 'created' in c: created = c['created']
-                    except: pass
+                try:
+                    c = load_config(cfg_path)
+                    if c:
+                        if 'type' in c: ptype = c['type']
+                        if 'created' in c: created = c['created']
+                except: pass
                 
                 reg[p] = {'path': full_path, 'type': ptype, 'created': created}
         except Exception as e: print(f"Error scanning {base_path}: {e}")
@@ -101,21 +98,30 @@ def sync_registry():
     scan_dir(YOCTO_BASE, 'yocto')
     scan_dir(UPSTREAM_BASE, 'upstream')
     
-    with open(REGISTRY_FILE, "w") as f: yaml.dump(reg, f)
+    save_registry(reg)
     return reg
 
+CONFIG_CACHE = {}    # config.yaml path -> (stamp, parsed config)
+
+def load_config(cfg_path):
+    """Parsed config.yaml (None if missing), reparsed only when the file changes on disk."""
+    stamp = file_stamp(cfg_path)
+    if stamp is None: return None
+    hit = CONFIG_CACHE.get(cfg_path)
+    if not hit or hit[0] != stamp:
+        with open(cfg_path) as f: hit = CONFIG_CACHE[cfg_path] = (stamp, load_yaml(f))
+    # Callers set keys on the config before writing it back: hand out a copy, keep the cached one clean
+    return dict(hit[1]) if isinstance(hit[1], dict) else hit[1]
+
 def get_config(project_name):
     # Try memory first, then file
     reg = sync_registry() # Sync to ensure we find restored projects
     data = reg.get(project_name)
     if not data: return None, None
     path = data['path']
-    cfg_path = os.path.join(path, "config.yaml")
-    if os.path.exists(cfg_path):
-        try:
-            with open(cfg_path) as f: return path, yaml.safe_load(f)
-        except: return path, {}
-    return path, {}
+    try: cfg = load_config(os.path.join(path, "config.yaml"))
+    except: return path, {}
+    return path, {} if cfg is None else cfg
 
 def find_yocto_image(path, machine):
     deploy_dir = os.path.join(path, "build/tmp/deploy/images", machine)
@@ -1015,7 +1021,7 @@ def create_step2_action():
     boards = []
     if ptype == 'yocto':
         repo_path = os.path.join(proj_path, "meta-qcom")
-        if not os.path.exists(repo_path): subprocess.run(["git", "clone", "https://github.com/qualcomm-linux/meta-qcom.git", repo_path], check=True)
+        if not os.path.exists(repo_path): clone_meta_qcom(repo_path).check_returncode()
         ci_path = os.path.join(repo_path, "ci")
         boards = [f for f in os.listdir(ci_path) if f.endswith('.yml')] if os.path.exists(ci_path) else []
         boards.sort()
@@ -1035,7 +1041,7 @@ def finish_create():
         cfg['image'] = "qcom-multimedia-image"
     else: cfg['kernel_repo'] = request.form['kernel_repo']
     
-    with open(os.path.join(proj_path, "config.yaml"), "w") as f: yaml.dump(cfg, f)
+    with open(os.path.join(proj_path, "config.yaml"), "w") as f: dump_yaml(cfg, f)
     sync_registry()
     return redirect('/')
 
@@ -1049,7 +1055,7 @@ def delete(name):
         threading.Thread(target=background_delete, args=(path, name)).start()
         # Remove from local registry immediately
         del reg[name]
-        with open(REGISTRY_FILE, "w") as f: yaml.dump(reg, f)
+        save_registry(reg)
     return redirect('/')
 
 @app.route('/download_artifact/<name>')
@@ -1245,7 +1251,7 @@ def handle_build(data):
     if ptype == 'yocto':
         topo = data.get('topology', 'ASOC')
         cfg['topology'] = topo
-        with open(os.path.join(path, "config.yaml"), "w") as f: yaml.dump(cfg, f)
+        with open(os.path.join(path, "config.yaml"), "w") as f: dump_yaml(cfg, f)
         distro = 'meta-qcom/ci/qcom-distro-prop-image.yml' if topo == 'AudioReach' else 'meta-qcom/ci/qcom-distro.yml'
         kas_args = f"{cfg.get('kas_files')}:{distro}"
         cmd = f"kas shell {kas_args} -c 'bitbake {cfg.get('image')}'"
@@ -1261,7 +1267,7 @@ def handle_build(data):
         git_ref_val = data.get('git_ref_val', '')
 
         cfg['target_image'] = img_name
-        with open(os.path.join(path, "config.yaml"), "w") as f: yaml.dump(cfg, f)
+        with open(os.path.join(path, "config.yaml"), "w") as f: dump_yaml(cfg, f)
         
         repo = cfg.get('kernel_repo')
         mkboot = os.path.join(TOOLS_DIR, "mkbootimg", "mkbootimg.py")
@@ -1393,6 +1399,14 @@ def api_list_dts():
     files = pm.list_dts_files()
     return jsonify({'files': files})
 
+# { (dts_base, filename): (stamps, diagrams) } - valid while every parsed DTS file keeps its mtime
+VIZ_CACHE = {}
+
+def dts_stamps(paths):
+    """(path, mtime_ns) of each file, sorted; None if any of them is gone."""
+    try: return tuple(sorted((p, os.stat(p).st_mtime_ns) for p in paths))
+    except OSError: return None
+
 @app.route('/api/viz/generate', methods=['POST'])
 def api_viz_generate():
     """API to parse and return Mermaid Code"""
@@ -1415,9 +1429,11 @@ def api_viz_generate():
     base_path = pm.get_dts_base_path()
     if not base_path: return jsonify({'error': 'DTS path not found'}), 404
     
-    parser = DtsParser(base_path)
-    parsed_data = parser.parse(filename)
-    
+    # Unchanged DTS sources: reuse the diagrams built for them last time
+    key = (base_path, filename)
+    hit = VIZ_CACHE.get(key)
+    if hit and dts_stamps(p for p, _ in hit[0]) == hit[0]: return jsonify(hit[1])
+
     # [V16 FIX] Initialize Parser with Base Path
     parser = DtsParser(base_path)
     parser.parse(filename)
@@ -1431,6 +1447,8 @@ def api_viz_generate():
     except Exception:
         diagrams["graph"] = {"nodes": [], "edges": []}
 
+    stamps = dts_stamps(parser.includes)
+    if stamps: VIZ_CACHE[key] = (stamps, diagrams)
     return jsonify(diagrams)
 
 if __name__ == '__main__':